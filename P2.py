@@ -1,84 +1,94 @@
 import requests
 import streamlit as st
 import pandas as pd
+import uuid
 from datetime import datetime
 from typing import Optional
 
-try:
-    import matplotlib.pyplot as plt  # type: ignore
-    HAS_MPL = True
-except Exception:
-    HAS_MPL = False
-
-API_BASE = "https://dadosabertos.camara.leg.br/api/v2"
-HEADERS = {"User-Agent": "Streamlit Busca Deputado/2.6", "Accept": "application/json"}
+import cache_frames
+import cache_memoria
+import deputados
+import despesas_store
+import exportar
+import fornecedores
+import graficos
+import metricas
+from camara_api import API_BASE, MAX_PAGES, PAGE_SIZE, fan_out
+from despesas import (
+    COLUNAS_DESPESAS, agrega_cubo, formata_reais, mensal, normalize_despesas, por_categoria, totais_comparados,
+)
+from prefetch import PREFETCH_RESULTADOS, get_prefetcher
+from roster import get_roster
 
 st.set_page_config(page_title="Buscar Deputado (2 páginas)", page_icon="🔎", layout="wide")
 st.title("🔎 Busca de Deputado")
 st.caption("Fonte: API de Dados Abertos da Câmara dos Deputados")
 
-@st.cache_data(ttl=1200)
+@metricas.instrumentar("search_deputados_by_name")
 def search_deputados_by_name(nome: str):
-    params = {"nome": nome, "ordem": "ASC", "ordenarPor": "nome", "itens": 100}
-    r = requests.get(f"{API_BASE}/deputados", params=params, headers=HEADERS, timeout=30)
-    r.raise_for_status()
-    return r.json().get("dados", [])
-
-@st.cache_data(ttl=1200)
-def list_deputados_by_partido(sigla_partido: str):
-    """Lista deputados em exercício de um partido (sigla)."""
-    params = {"siglaPartido": sigla_partido, "ordem": "ASC", "ordenarPor": "nome", "itens": 100}
-    r = requests.get(f"{API_BASE}/deputados", params=params, headers=HEADERS, timeout=30)
-    r.raise_for_status()
-    return r.json().get("dados", [])
-
+    return deputados.search_deputados_by_name(nome)
 
-@st.cache_data(ttl=1800)
+@metricas.instrumentar("get_deputado_details")
+@cache_memoria.limitado("get_deputado_details", ttl=1800, cota=0.05)
+@metricas.contar_miss("get_deputado_details")
 def get_deputado_details(dep_id: int):
-    r = requests.get(f"{API_BASE}/deputados/{dep_id}", headers=HEADERS, timeout=30)
-    r.raise_for_status()
-    return r.json().get("dados", {})
+    return deputados.get_deputado_details(dep_id)
 
 
-@st.cache_data(ttl=600)
+# Despesas no cache compartilhado entre os workers (arquivos Arrow); desligado, no cache em memória
+_cache_despesas = (
+    cache_frames.compartilhado("get_despesas", ttl=600) if cache_frames.ATIVO
+    else cache_memoria.limitado("get_despesas", ttl=600, cota=0.6)
+)
+
+@metricas.instrumentar("get_despesas")
+@_cache_despesas
+@metricas.contar_miss("get_despesas")
 def get_despesas(dep_id: int, ano: Optional[int] = None) -> pd.DataFrame:
-    """Busca despesas do deputado e retorna DataFrame."""
-    url = f"{API_BASE}/deputados/{dep_id}/despesas"
-    params = {"ordem": "DESC", "ordenarPor": "dataDocumento"}
-    if ano is not None:
-        params["ano"] = ano
-
-    dados_total: list[dict] = []
-    pagina = 1
-    for _ in range(50):  # limite de segurança
-        params.update({"pagina": pagina, "itens": 100})
-        r = requests.get(url, params=params, headers=HEADERS, timeout=30)
-        r.raise_for_status()
-        resp = r.json()
-        dados = resp.get("dados", [])
-        dados_total.extend(dados)
-        links = resp.get("links", [])
-        has_next = any(l.get("rel") == "next" for l in links)
-        if not has_next:
-            break
-        pagina += 1
-
-    return pd.DataFrame(dados_total)
-
-
-@st.cache_data(ttl=900)
+    return deputados.get_despesas(dep_id, ano)
+
+stream_despesas = deputados.stream_despesas
+
+@metricas.instrumentar("get_cubo")
+@cache_memoria.limitado("get_cubo", ttl=600, cota=0.1)
+@metricas.contar_miss("get_cubo")
+def get_cubo(dep_id: int, ano: int) -> pd.DataFrame:
+    """Totais do ano por mês e tipo de despesa; só carrega as linhas se o cubo não estiver salvo."""
+    return deputados.get_cubo(dep_id, ano, carregar=lambda d, a: get_despesas(d, ano=a))
+
+
+@metricas.instrumentar("get_despesas_por_ano")
 def get_despesas_por_ano(dep_id: int, ano_ini: int = 2015, ano_fim: Optional[int] = None) -> pd.DataFrame:
-    """Agrega despesas por ano (valor líquido) para o deputado selecionado."""
-    if ano_fim is None:
-        ano_fim = datetime.now().year
-    rows = []
-    for ano in range(ano_ini, ano_fim + 1):
-        df = get_despesas(dep_id, ano=ano)
-        total = 0.0
-        if not df.empty:
-            total = pd.to_numeric(df.get("valorLiquido"), errors="coerce").fillna(0).sum()
-        rows.append({"Ano": ano, "TotalLiquido": float(total)})
-    return pd.DataFrame(rows)
+    """Agrega despesas por ano (valor líquido), a partir do cubo de cada ano."""
+    return deputados.get_despesas_por_ano(
+        dep_id, ano_ini, ano_fim, total_ano=lambda d, a: float(get_cubo(d, a)["valorLiquido"].sum())
+    )
+
+@metricas.instrumentar("get_despesas_varios")
+def get_despesas_varios(dep_ids: tuple, ano_ini: int, ano_fim: int) -> pd.DataFrame:
+    """Despesas combinadas da comparação; cada (deputado, ano) vem do cache de get_despesas."""
+    return deputados.get_despesas_varios(
+        dep_ids, range(ano_ini, ano_fim + 1), carregar=lambda d, a: get_despesas(d, ano=a)
+    )
+
+@cache_memoria.limitado("exportar_deputados", cota=0.05)
+def exportar_deputados(df: pd.DataFrame) -> bytes:
+    return exportar.csv_bytes(df)
+
+@cache_memoria.limitado("exportar_despesas", ttl=600, cota=0.2)
+def exportar_despesas(dep_id: int, ano: int, formato: str) -> bytes:
+    """Despesas de um ano em CSV ou Parquet (só roda quando o botão de download é clicado)."""
+    df = get_despesas(dep_id, ano=ano)[COLUNAS_DESPESAS]
+    return exportar.parquet_bytes(df) if formato == "parquet" else exportar.csv_bytes(df)
+
+@cache_memoria.limitado("exportar_historico", ttl=600, cota=0.2)
+def exportar_historico(dep_id: int, ano_ini: int, ano_fim: int) -> bytes:
+    """ZIP com um CSV por ano, montado um ano por vez."""
+    return exportar.zip_despesas(
+        dep_id, range(ano_ini, ano_fim + 1), lambda d, a: get_despesas(d, ano=a)[COLUNAS_DESPESAS]
+    )
+
+PAGINAS = ["Pesquisa", "Respostas", "Fornecedores"]
 
 for key, default in {
     "pagina": "Pesquisa",
@@ -88,6 +98,9 @@ for key, default in {
     "tabela_compacta": True,
     "mostrar_link_api": True,
     "mostrar_despesas": True,
+    "prefetch": True,
+    "graficos_cliente": graficos.CLIENTE_PADRAO,
+    "sessao_id": uuid.uuid4().hex,
 }.items():
     if key not in st.session_state:
         st.session_state[key] = default
@@ -104,19 +117,28 @@ with st.sidebar:
     st.session_state.mostrar_despesas = st.checkbox(
         "Mostrar seção de despesas", value=st.session_state.mostrar_despesas
     )
+    st.session_state.prefetch = st.checkbox(
+        "Pré-carregar próximos resultados e anos", value=st.session_state.prefetch,
+        help="Busca em segundo plano os detalhes dos primeiros resultados e as despesas dos anos vizinhos.",
+    )
+    st.session_state.graficos_cliente = st.checkbox(
+        "Desenhar gráficos no navegador", value=st.session_state.graficos_cliente,
+        help="Usa gráficos interativos desenhados pelo navegador, sem gerar imagens no servidor.",
+    )
 
     st.markdown("---")
     st.caption("Use o menu abaixo para alternar páginas.")
     pagina_sidebar = st.radio(
         "Navegação",
-        options=["Pesquisa", "Respostas"],
-        index=0 if st.session_state.pagina == "Pesquisa" else 1,
+        options=PAGINAS,
+        index=PAGINAS.index(st.session_state.pagina),
     )
     if pagina_sidebar != st.session_state.pagina:
         st.session_state.pagina = pagina_sidebar
         st.rerun()
 
 if st.session_state.pagina == "Pesquisa":
+    get_prefetcher().cancelar(st.session_state.sessao_id)
     st.subheader("Pesquisa")
     with st.form("form_pesquisa"):
         nome_query = st.text_input(
@@ -197,155 +219,307 @@ if st.session_state.pagina == "Respostas":
         st.session_state.dep_id = dep_id
 
         # Mantemos o botão de baixar CSV
-        csv_dep = df_dep[["nome", "siglaPartido", "siglaUf", "email", "id"]].rename(
+        tabela_csv = df_dep[["nome", "siglaPartido", "siglaUf", "email", "id"]].rename(
             columns={"nome": "Nome", "siglaPartido": "Partido", "siglaUf": "UF", "email": "E-mail", "id": "ID"}
-        ).to_csv(index=False).encode("utf-8")
-        st.download_button("⬇️ Baixar CSV (deputados)", data=csv_dep, file_name="deputados.csv", mime="text/csv")
+        )
+        st.download_button(
+            "⬇️ Baixar CSV (deputados)", data=lambda: exportar_deputados(tabela_csv), file_name="deputados.csv", mime="text/csv"
+        )
+
+        # --- Modo comparação: vários deputados lado a lado ---
+        if len(resultados) > 1 and st.toggle("Comparar deputados", key="modo_comparacao"):
+            with metricas.secao("comparacao"):
+                st.markdown("### Comparação de despesas")
+                nomes = {d["id"]: f"{d['nome']} ({d.get('siglaPartido','?')}/{d.get('siglaUf','?')})" for d in resultados}
+                hoje = datetime.now().year
+                escolhidos = st.multiselect(
+                    "Deputados", options=list(nomes), default=list(nomes)[:2], format_func=nomes.get, max_selections=6
+                )
+                ano_ini_cmp, ano_fim_cmp = st.slider("Anos", 2015, hoje, (hoje - 1, hoje))
+                agrupar = st.radio("Agrupar por", ["Ano", "Mês", "Categoria"], horizontal=True)
+                if escolhidos:
+                    try:
+                        df_cmp = get_despesas_varios(tuple(escolhidos), ano_ini_cmp, ano_fim_cmp)
+                    except requests.RequestException as e:
+                        st.error(f"Erro ao buscar despesas para a comparação: {e}")
+                        df_cmp = None
+                    if df_cmp is not None:
+                        if df_cmp.attrs.get("falhas"):
+                            st.warning(
+                                "Não foi possível carregar: "
+                                + ", ".join(f"{nomes[d]} em {a}" for d, a in df_cmp.attrs["falhas"])
+                            )
+                        if df_cmp.empty:
+                            st.info("Nenhuma despesa encontrada para os deputados e anos escolhidos.")
+                        else:
+                            por = {"Ano": "ano", "Mês": "mes", "Categoria": "tipoDespesa"}[agrupar]
+                            totais = totais_comparados(df_cmp, por)
+                            for col, (dep, total) in zip(st.columns(len(totais.columns)), totais.sum().items()):
+                                col.metric(nomes[dep], formata_reais(total))
+                            totais = totais.rename(columns=nomes)
+                            if por == "tipoDespesa":
+                                st.bar_chart(totais, stack=False)
+                            else:
+                                st.line_chart(totais)
+                            st.dataframe(totais, use_container_width=True)
 
         st.markdown("---")
         st.markdown("### Detalhes e despesas do parlamentar")
 
         if dep_id:
-            try:
-                detalhes = get_deputado_details(dep_id)
-            except requests.RequestException as e:
-                st.error(f"Erro ao buscar detalhes do deputado: {e}")
-                st.stop()
-
-            ultimo = detalhes.get("ultimoStatus", {}) or {}
-            gabinete = ultimo.get("gabinete", {}) or {}
-
-            # Campos principais
-            nome_eleitoral = ultimo.get("nomeEleitoral")
-            nome_civil = detalhes.get("nomeCivil")
-            sigla_partido = ultimo.get("siglaPartido")
-            sigla_uf = ultimo.get("siglaUf")
-            situacao = ultimo.get("situacao")
-            condicao = ultimo.get("condicaoEleitoral")
-            url_foto = ultimo.get("urlFoto")
-            email = gabinete.get("email") or detalhes.get("email")
-            telefone = gabinete.get("telefone")
-            predio = gabinete.get("predio")
-            sala = gabinete.get("sala")
-            andar = gabinete.get("andar")
-            nome_gab = gabinete.get("nome")
-
-            c1, c2 = st.columns([1, 2], vertical_alignment="top")
-            with c1:
-                if url_foto:
-                    st.image(url_foto, caption=nome_eleitoral or nome_civil, use_container_width=True)
-                else:
-                    st.write("Sem foto disponível")
-            with c2:
-                st.subheader(nome_eleitoral or nome_civil or "Deputado(a)")
-                st.write(f"**Partido/UF:** {sigla_partido or '—'}/{sigla_uf or '—'}")
-                st.write(f"**Situação no cargo:** {situacao or '—'}")
-                st.write(f"**Condição eleitoral:** {condicao or '—'}")
-                st.write(f"**E-mail do gabinete:** {email or '—'}")
-                st.write(f"**Gabinete:** {nome_gab or '—'} • Prédio {predio or '—'}, sala {sala or '—'}, andar {andar or '—'}")
-                st.write(f"**Telefone:** {telefone or '—'}")
-
-            
-            st.markdown("### Distribuição do partido por UF")
-            if sigla_partido:
-                try:
-                    lista_partido = list_deputados_by_partido(sigla_partido)
-                    df_part = pd.DataFrame(lista_partido)
-                    if not df_part.empty and "siglaUf" in df_part.columns:
-                        contagem_uf = df_part["siglaUf"].value_counts().sort_index()
-                        st.bar_chart(contagem_uf)
-                    else:
-                        st.info("Não foi possível calcular a distribuição por UF para este partido.")
-                except requests.RequestException as e:
-                    st.error(f"Erro ao buscar deputados do partido {sigla_partido}: {e}")
-            else:
-                st.info("Partido não disponível para o(a) deputado(a) selecionado(a).")
-
-            
-            if st.session_state.get("mostrar_despesas", True):
-                st.markdown("#### Despesas do deputado")
-                ano_atual = datetime.now().year
-                ano = st.selectbox(
-                    "Ano",
-                    options=list(range(2015, ano_atual + 1))[::-1],
-                    index=0,
-                )
-                df_desp = get_despesas(dep_id, ano=ano)
-
-                if df_desp.empty:
-                    st.info("Nenhuma despesa encontrada para os filtros selecionados.")
-                else:
-                    cols_keep = [
-                        "ano","mes","dataDocumento","descricaoTipoDespesa","tipoDespesa",
-                        "nomeFornecedor","cnpjCpfFornecedor","valorDocumento","valorLiquido","urlDocumento"
-                    ]
-                    for c in cols_keep:
-                        if c not in df_desp.columns:
-                            df_desp[c] = None
-
-                    # Conversões e ordenação
-                    df_desp["dataDocumento"] = pd.to_datetime(df_desp["dataDocumento"], errors="coerce")
-                    # Garante que exista coluna 'mes' numérica (se não existir, tenta extrair de dataDocumento)
-                    if df_desp.get('mes') is None or df_desp['mes'].isnull().all():
-                        df_desp['mes'] = df_desp['dataDocumento'].dt.month
-
-                    df_view = df_desp[cols_keep].sort_values("dataDocumento", ascending=False).copy()
-
-                    total_liq = pd.to_numeric(df_view["valorLiquido"], errors="coerce").fillna(0).sum()
-                    total_doc = pd.to_numeric(df_view["valorDocumento"], errors="coerce").fillna(0).sum()
-                    m1, m2 = st.columns(2)
-                    with m1:
-                        st.metric("Total (valor líquido)", f"R$ {total_liq:,.2f}".replace(",","X").replace(".",",").replace("X","."))
-                    with m2:
-                        st.metric("Total (valor documento)", f"R$ {total_doc:,.2f}".replace(",","X").replace(".",",").replace("X","."))
-
-                    # Apresentação da tabela de despesas (mantemos como opcional para não poluir a tela)
-                    if st.checkbox("Mostrar tabela de despesas", value=False):
-                        st.dataframe(df_view, use_container_width=True)
-
-                    csv_desp = df_view.to_csv(index=False).encode("utf-8")
-                    st.download_button(
-                        "⬇️ Baixar CSV (despesas)", data=csv_desp, file_name=f"despesas_{dep_id}_{ano}.csv", mime="text/csv"
+            mostrar_despesas = st.session_state.get("mostrar_despesas", True)
+            # Seções na ordem da página; cada uma é preenchida quando seus dados chegam
+            sec_detalhes = st.container()
+            sec_partido = st.container()
+            sec_despesas = st.container()
+
+            # --- Seção de despesas (opcional via sidebar) ---
+            if mostrar_despesas:
+                with sec_despesas:
+                    st.markdown("#### Despesas do deputado")
+                    ano_atual = datetime.now().year
+                    ano = st.selectbox(
+                        "Ano",
+                        options=list(range(2015, ano_atual + 1))[::-1],
+                        index=0,
                     )
-
-                # --- Gráfico mensal de despesas (modificação solicitada) ---
-                st.markdown("#### Evolução mensal de despesas no ano selecionado (valor líquido)")
-
-                if not df_desp.empty:
-                    # Normaliza e agrega por mês
-                    df_mes = (
-                        df_desp.assign(
-                            mes=lambda x: pd.to_numeric(x.get('mes', x['dataDocumento'].dt.month), errors="coerce").fillna(0).astype(int),
-                            valorLiquido=lambda x: pd.to_numeric(x.get('valorLiquido'), errors="coerce").fillna(0)
-                        )
-                        .groupby('mes')['valorLiquido']
-                        .sum()
-                        .reset_index()
-                        .sort_values('mes')
+                    progresso_despesas = st.empty()
+
+            # Busca tudo ao mesmo tempo; só a distribuição do partido depende dos detalhes
+            tarefas = {"detalhes": lambda: get_deputado_details(dep_id)}
+            fluxos = {}
+            if mostrar_despesas:
+                if despesas_store.has_local(dep_id, ano):
+                    tarefas["despesas"] = lambda: get_despesas(dep_id, ano=ano)
+                else:
+                    # Sem dados locais: busca em fluxo, mostrando as páginas conforme chegam
+                    fluxos["despesas"] = lambda: stream_despesas(dep_id, ano)
+
+            df_parcial = normalize_despesas([])
+            cubo_parcial = agrega_cubo(df_parcial.assign(dep_id=dep_id))
+            for secao, parcial, resultado in fan_out(tarefas, fluxos):
+                if secao == "detalhes":
+                    try:
+                        detalhes = resultado.result()
+                    except requests.RequestException as e:
+                        sec_detalhes.error(f"Erro ao buscar detalhes do deputado: {e}")
+                        continue
+
+                    with sec_detalhes, metricas.secao("detalhes"):
+                        ultimo = detalhes.get("ultimoStatus", {}) or {}
+                        gabinete = ultimo.get("gabinete", {}) or {}
+
+                        # Campos principais
+                        nome_eleitoral = ultimo.get("nomeEleitoral")
+                        nome_civil = detalhes.get("nomeCivil")
+                        sigla_partido = ultimo.get("siglaPartido")
+                        sigla_uf = ultimo.get("siglaUf")
+                        situacao = ultimo.get("situacao")
+                        condicao = ultimo.get("condicaoEleitoral")
+                        url_foto = ultimo.get("urlFoto")
+                        email = gabinete.get("email") or detalhes.get("email")
+                        telefone = gabinete.get("telefone")
+                        predio = gabinete.get("predio")
+                        sala = gabinete.get("sala")
+                        andar = gabinete.get("andar")
+                        nome_gab = gabinete.get("nome")
+
+                        c1, c2 = st.columns([1, 2], vertical_alignment="top")
+                        with c1:
+                            if url_foto:
+                                st.image(url_foto, caption=nome_eleitoral or nome_civil, use_container_width=True)
+                            else:
+                                st.write("Sem foto disponível")
+                        with c2:
+                            st.subheader(nome_eleitoral or nome_civil or "Deputado(a)")
+                            st.write(f"**Partido/UF:** {sigla_partido or '—'}/{sigla_uf or '—'}")
+                            st.write(f"**Situação no cargo:** {situacao or '—'}")
+                            st.write(f"**Condição eleitoral:** {condicao or '—'}")
+                            st.write(f"**E-mail do gabinete:** {email or '—'}")
+                            st.write(f"**Gabinete:** {nome_gab or '—'} • Prédio {predio or '—'}, sala {sala or '—'}, andar {andar or '—'}")
+                            st.write(f"**Telefone:** {telefone or '—'}")
+
+                    # --- Gráfico: partido do deputado por UF ---
+                    with sec_partido, metricas.secao("partido"):
+                        st.markdown("### Distribuição do partido por UF")
+                        if sigla_partido:
+                            try:
+                                contagem_uf = get_roster().contagem_uf(sigla_partido)
+                                if not contagem_uf.empty:
+                                    st.bar_chart(contagem_uf)
+                                else:
+                                    st.info("Não foi possível calcular a distribuição por UF para este partido.")
+                            except requests.RequestException as e:
+                                st.error(f"Erro ao buscar deputados do partido {sigla_partido}: {e}")
+                        else:
+                            st.info("Partido não disponível para o(a) deputado(a) selecionado(a).")
+
+                elif secao == "despesas" and parcial is not None:
+                    # Página do fluxo: progresso, totais parciais e tabela que cresce
+                    pagina, total, linhas = parcial
+                    # Só a página nova é normalizada; as páginas vêm em ordem (DESC por data)
+                    df_pagina = normalize_despesas(linhas)
+                    df_parcial = pd.concat([df_parcial, df_pagina], ignore_index=True)
+                    # Totais somados página a página no cubo, sem reagregar o que já chegou
+                    cubo_parcial = agrega_cubo(
+                        pd.concat([cubo_parcial, agrega_cubo(df_pagina.assign(dep_id=dep_id))])
                     )
-
-                    # Preenche meses faltantes (opcional) para visualizar 1..12
-                    all_months = pd.DataFrame({'mes': list(range(1,13))})
-                    df_mes_full = all_months.merge(df_mes, on='mes', how='left').fillna(0)
-                    df_mes_full = df_mes_full.set_index('mes')
-
-                    if df_mes_full['valorLiquido'].sum() == 0:
-                        st.info("Sem dados mensais para exibir no ano selecionado.")
-                    else:
-                        # Exibe gráfico (matplotlib se disponível, senão st.line_chart)
-                        if HAS_MPL:
-                            fig, ax = plt.subplots()
-                            ax.plot(df_mes_full.index, df_mes_full['valorLiquido'], marker='o')
-                            ax.set_xticks(range(1,13))
-                            ax.set_xlabel('Mês')
-                            ax.set_ylabel('Total (R$)')
-                            ax.grid(True, linestyle=':', alpha=0.5)
-                            st.pyplot(fig, clear_figure=True)
+                    with progresso_despesas.container(), metricas.secao("despesas_parcial"):
+                        if total:
+                            st.progress(pagina / total, text=f"Páginas carregadas: {pagina} de {total}")
                         else:
-                            st.line_chart(df_mes_full['valorLiquido'])
-                else:
-                    st.info("Sem dados de despesas para gerar o gráfico mensal.")
+                            st.caption(f"Páginas carregadas: {pagina}")
+                        m1, m2 = st.columns(2)
+                        m1.metric("Total (valor líquido)", formata_reais(cubo_parcial["valorLiquido"].sum()))
+                        m2.metric("Total (valor documento)", formata_reais(cubo_parcial["valorDocumento"].sum()))
+                        if st.session_state.get("mostrar_tabela_despesas"):
+                            st.dataframe(df_parcial[COLUNAS_DESPESAS], use_container_width=True)
+
+                elif secao == "despesas":
+                    progresso_despesas.empty()
+                    try:
+                        df_desp = resultado.result()
+                    except requests.RequestException as e:
+                        sec_despesas.error(f"Erro ao buscar despesas do deputado: {e}")
+                        continue
+
+                    with sec_despesas, metricas.secao("despesas"):
+                        if df_desp.attrs.get("truncado"):
+                            st.warning(
+                                f"Resultado truncado: exibindo apenas as primeiras {MAX_PAGES * PAGE_SIZE} despesas "
+                                "retornadas pela API."
+                            )
+
+                        if df_desp.empty:
+                            st.info("Nenhuma despesa encontrada para os filtros selecionados.")
+                        else:
+                            df_view = df_desp[COLUNAS_DESPESAS]
+                            # Cubo do mesmo DataFrame da tabela: totais e tabela nunca divergem
+                            cubo = agrega_cubo(df_desp.assign(dep_id=dep_id))
+
+                            total_liq = cubo["valorLiquido"].sum()
+                            total_doc = cubo["valorDocumento"].sum()
+                            m1, m2, m3 = st.columns(3)
+                            with m1:
+                                st.metric("Total (valor líquido)", formata_reais(total_liq))
+                            with m2:
+                                st.metric("Total (valor documento)", formata_reais(total_doc))
+                            with m3:
+                                st.metric("Documentos", f"{int(cubo['linhas'].sum()):,}".replace(",", "."))
+
+                            # --- Por tipo de despesa (do cubo) ---
+                            st.markdown("##### Por tipo de despesa")
+                            categorias = por_categoria(cubo)
+                            st.bar_chart(categorias["valorLiquido"], horizontal=True)
+                            st.dataframe(
+                                categorias.rename(columns={
+                                    "valorLiquido": "Valor líquido", "valorDocumento": "Valor documento", "linhas": "Documentos",
+                                }),
+                                use_container_width=True,
+                            )
+
+                            # Apresentação da tabela de despesas (mantemos como opcional para não poluir a tela)
+                            if st.checkbox("Mostrar tabela de despesas", value=False, key="mostrar_tabela_despesas"):
+                                st.dataframe(df_view, use_container_width=True)
+
+                            # Arquivos montados só no clique (e guardados em cache)
+                            b1, b2, b3 = st.columns(3)
+                            b1.download_button(
+                                "⬇️ Baixar CSV (despesas)", data=lambda: exportar_despesas(dep_id, ano, "csv"),
+                                file_name=f"despesas_{dep_id}_{ano}.csv", mime="text/csv",
+                            )
+                            b2.download_button(
+                                "⬇️ Baixar Parquet (despesas)", data=lambda: exportar_despesas(dep_id, ano, "parquet"),
+                                file_name=f"despesas_{dep_id}_{ano}.parquet", mime="application/octet-stream",
+                            )
+                            b3.download_button(
+                                f"⬇️ Baixar histórico 2015–{ano_atual} (ZIP)",
+                                data=lambda: exportar_historico(dep_id, 2015, ano_atual),
+                                file_name=f"despesas_{dep_id}_2015-{ano_atual}.zip", mime="application/zip",
+                            )
+
+                        # --- Gráfico mensal de despesas (modificação solicitada) ---
+                        st.markdown("#### Evolução mensal de despesas no ano selecionado (valor líquido)")
+
+                        if not df_desp.empty:
+                            # Meses 1..12 (sem despesa = 0), direto do cubo do ano
+                            serie_mes = mensal(cubo)
+
+                            if serie_mes.sum() == 0:
+                                st.info("Sem dados mensais para exibir no ano selecionado.")
+                            else:
+                                # PNG do matplotlib em cache (se disponível) ou st.line_chart, desenhado no navegador
+                                png = None
+                                if not st.session_state.graficos_cliente:
+                                    png = graficos.linha_png(
+                                        serie_mes.index, serie_mes, 'Mês', 'Total (R$)', xticks=range(1, 13)
+                                    )
+                                if png is not None:
+                                    st.image(png, use_container_width=True)
+                                else:
+                                    st.line_chart(serie_mes.rename_axis('mes'))
+                        else:
+                            st.info("Sem dados de despesas para gerar o gráfico mensal.")
 
             # Link para API
             if st.session_state.get("mostrar_link_api", True):
                 st.markdown(f"Ver na API: [deputados/{dep_id}]({API_BASE}/deputados/{dep_id})")
+
+            # --- Pré-carregamento do que o usuário deve abrir em seguida ---
+            if st.session_state.get("prefetch", True):
+                proximas = []
+                if mostrar_despesas:
+                    for vizinho in (ano - 1, ano + 1):
+                        if 2015 <= vizinho <= ano_atual:
+                            proximas.append((("despesas", dep_id, vizinho), lambda a=vizinho: get_despesas(dep_id, ano=a)))
+                for d in resultados[:PREFETCH_RESULTADOS]:
+                    if d["id"] != dep_id:
+                        proximas.append((("detalhes", d["id"]), lambda i=d["id"]: get_deputado_details(i)))
+                get_prefetcher().agendar(st.session_state.sessao_id, proximas)
+            else:
+                get_prefetcher().cancelar(st.session_state.sessao_id)
+
+if st.session_state.pagina == "Fornecedores":
+    get_prefetcher().cancelar(st.session_state.sessao_id)
+    st.subheader("Fornecedores")
+    st.caption("Deputados que pagaram cada fornecedor, a partir do dataset local de despesas.")
+    indice = fornecedores.get_indice()
+    if not len(indice):
+        st.info(
+            "O índice de fornecedores está vazio. Ingira os arquivos anuais da Câmara com "
+            "`python despesas_dataset.py --ano AAAA` (ou `python fornecedores.py --reconstruir`)."
+        )
+    else:
+        busca = st.text_input("CNPJ/CPF ou nome do fornecedor", placeholder="ex.: 33.000.118/0001-79, Posto, Gol…")
+        if busca.strip():
+            linhas = indice.buscar(busca)
+            if linhas.empty:
+                st.info("Nenhum fornecedor encontrado.")
+            else:
+                st.markdown("#### Fornecedores encontrados")
+                st.dataframe(fornecedores.fornecedores_encontrados(linhas), use_container_width=True, hide_index=True)
+
+                st.markdown("#### Deputados que pagaram, por ano (valor líquido)")
+                tabela = fornecedores.totais_por_deputado(linhas)
+                # Nome do arquivo em lote; para partições antigas, do roster atual
+                nomes = linhas.dropna(subset=["nomeParlamentar"]).groupby("dep_id")["nomeParlamentar"].first().to_dict()
+                try:
+                    nomes = {d["id"]: d["nome"] for d in get_roster().deputados} | nomes
+                except requests.RequestException:
+                    pass
+                tabela.index = [nomes.get(dep, f"ID {dep}") for dep in tabela.index]
+                st.metric("Total pago ao(s) fornecedor(es)", formata_reais(tabela["Total"].sum()))
+                st.dataframe(tabela, use_container_width=True)
+
+# --- Diagnóstico (só com CAMARA_METRICS=1) ---
+if metricas.ATIVO:
+    with st.sidebar.expander("Diagnóstico"):
+        st.caption("Métricas do processo desde o início (HTTP, cache e renderização).")
+        st.dataframe(pd.DataFrame(metricas.tabela()), use_container_width=True, hide_index=True)
+        st.caption(
+            f"Caches em memória do processo (fetchers, DataFrames montados, respostas HTTP, gráficos e índices): "
+            f"teto comum de {cache_memoria.ORCAMENTO_BYTES / 2**20:.0f} MiB. Os arquivos mapeados de cache_frames ficam fora."
+        )
+        st.dataframe(pd.DataFrame(cache_memoria.estatisticas()), use_container_width=True, hide_index=True)
+        st.code(metricas.dump(), language="text")
+    metricas.escrever_arquivo()
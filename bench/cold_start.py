@@ -0,0 +1,115 @@
+"""Tempo de partida a frio: imports e primeira renderização de P1.py e P2.py.
+
+Cada medida roda num processo Python novo (o que um worker recém-criado
+paga). Mede a importação do Streamlit, a importação da camada de dados
+sem Streamlit, a primeira execução do app pelo `AppTest` (página de
+Pesquisa), o rerun seguinte e se o matplotlib acabou carregado. Sai a
+mediana de `--repeticoes` processos, em JSON.
+
+Uso:
+    python bench/cold_start.py --repeticoes 5 --saida cold.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(BENCH_DIR)
+APPS = ["P1.py", "P2.py"]
+# Módulos da camada de dados (importáveis sem Streamlit)
+CAMADA_DADOS = ["deputados"]
+
+
+def _worker(app: str) -> None:
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+    medidas = {}
+
+    inicio = time.perf_counter()
+    for modulo in CAMADA_DADOS:
+        __import__(modulo)
+    medidas["import_dados_s"] = time.perf_counter() - inicio
+    medidas["dados_importa_streamlit"] = "streamlit" in sys.modules
+
+    inicio = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    medidas["import_streamlit_s"] = time.perf_counter() - inicio
+
+    at = AppTest.from_file(os.path.join(RAIZ, app), default_timeout=120)
+    inicio = time.perf_counter()
+    at.run()
+    medidas["primeira_render_s"] = time.perf_counter() - inicio
+    if at.exception:
+        raise RuntimeError(f"{app}: {at.exception[0].value}")
+
+    inicio = time.perf_counter()
+    at.run()
+    medidas["rerun_s"] = time.perf_counter() - inicio
+    medidas["matplotlib_carregado"] = "matplotlib" in sys.modules
+    print(json.dumps(medidas))
+
+
+def _mediana(amostras: list[dict]) -> dict:
+    resumo = {}
+    for chave, valor in amostras[0].items():
+        if isinstance(valor, bool):
+            resumo[chave] = valor
+        else:
+            resumo[chave] = round(statistics.median(a[chave] for a in amostras), 4)
+    return resumo
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tempo de partida a frio dos apps de deputados.")
+    parser.add_argument("--apps", nargs="+", default=APPS)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args.worker)
+        return
+
+    resultados = []
+    for app in args.apps:
+        amostras = []
+        for _ in range(args.repeticoes):
+            with tempfile.TemporaryDirectory() as tmp:
+                env = dict(
+                    os.environ,
+                    # Nada aqui deve ir à rede; a URL inválida garante isso
+                    CAMARA_API_BASE="http://127.0.0.1:9/api/v2",
+                    CAMARA_CACHE_DIR=os.path.join(tmp, "cache"),
+                    CAMARA_DATA_DIR=os.path.join(tmp, "dataset"),
+                )
+                saida = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--worker", app], env=env, capture_output=True, text=True
+                )
+                if saida.returncode != 0:
+                    sys.exit(f"{app} falhou:\n{saida.stderr}")
+                amostras.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+        resultados.append({"app": app, "repeticoes": args.repeticoes, **_mediana(amostras)})
+
+    relatorio = {
+        "gerado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "resultados": resultados,
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
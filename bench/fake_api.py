@@ -0,0 +1,185 @@
+"""Servidor local que imita a `/api/v2` da Câmara para os benchmarks.
+
+Serve as fixtures de `bench/fixtures` com latência e número de páginas
+configuráveis e conta requisições e bytes enviados (consultáveis em
+`GET /__stats`; `POST /__stats` zera os contadores).
+
+Uso isolado:
+    python bench/fake_api.py --porta 8765 --latencia-ms 80 --paginas 12
+    CAMARA_API_BASE=http://127.0.0.1:8765/api/v2 streamlit run P1.py
+"""
+import argparse
+import copy
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _fixture(nome: str):
+    with open(os.path.join(FIXTURES, nome), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FakeCamara:
+    """Estado do servidor: fixtures, configuração e contadores."""
+
+    def __init__(self, latencia: float = 0.0, paginas_despesas: int = 5):
+        self.latencia = latencia
+        self.paginas_despesas = paginas_despesas
+        self.deputados = _fixture("deputados.json")
+        self.detalhe = _fixture("deputado.json")
+        self.pagina_despesas = _fixture("despesas.json")
+        self._lock = threading.Lock()
+        self.zerar()
+
+    def zerar(self) -> None:
+        with self._lock:
+            self.requisicoes = 0
+            self.bytes = 0
+
+    def contar(self, n_bytes: int) -> None:
+        with self._lock:
+            self.requisicoes += 1
+            self.bytes += n_bytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requisicoes": self.requisicoes, "bytes": self.bytes}
+
+    def detalhes(self, dep_id: int) -> Optional[dict]:
+        dep = next((d for d in self.deputados if d["id"] == dep_id), None)
+        if dep is None:
+            return None
+        dados = copy.deepcopy(self.detalhe)
+        dados.update(id=dep_id, uri=dep["uri"], nomeCivil=dep["nome"])
+        dados["ultimoStatus"].update(
+            id=dep_id, nome=dep["nome"], nomeEleitoral=dep["nome"], siglaPartido=dep["siglaPartido"],
+            siglaUf=dep["siglaUf"], urlFoto=dep["urlFoto"], email=dep["email"],
+        )
+        dados["ultimoStatus"]["gabinete"]["email"] = dep["email"]
+        return dados
+
+    def despesas(self, dep_id: int, ano: int) -> list[dict]:
+        """`paginas_despesas` páginas cheias para (deputado, ano), da mais recente para a mais antiga.
+
+        As datas descem de 31/12 a 01/01 ao longo de todas as páginas, como
+        na API com `ordenarPor=dataDocumento&ordem=DESC`.
+        """
+        total = self.paginas_despesas * len(self.pagina_despesas)
+        fim = date(ano, 12, 31)
+        dias = (fim - date(ano, 1, 1)).days + 1
+        linhas = []
+        for k in range(total):
+            modelo = self.pagina_despesas[k % len(self.pagina_despesas)]
+            dia = fim - timedelta(days=k * dias // total)
+            linha = dict(modelo, ano=ano, mes=dia.month)
+            linha["dataDocumento"] = f"{dia.isoformat()}T00:00:00"
+            linha["codDocumento"] = dep_id * 10_000_000 + ano * 1000 + k
+            linhas.append(linha)
+        return linhas
+
+
+def _handler(api: FakeCamara):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _enviar(self, status: int, corpo: Optional[dict]) -> int:
+            dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8") if corpo is not None else b""
+            gz = "gzip" in self.headers.get("Accept-Encoding", "")
+            if gz and dados:
+                dados = gzip.compress(dados, compresslevel=5)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            if gz and dados:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+            return len(dados)
+
+        def do_POST(self):
+            if self.path == "/__stats":
+                api.zerar()
+                self._enviar(200, {})
+            else:
+                self._enviar(404, None)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/__stats":
+                self._enviar(200, api.stats())
+                return
+            if api.latencia:
+                time.sleep(api.latencia)
+            q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            partes = [p for p in url.path.split("/api/v2", 1)[-1].split("/") if p]
+
+            if partes == ["deputados"]:
+                linhas = api.deputados
+                if "nome" in q:
+                    linhas = [d for d in linhas if q["nome"].lower() in d["nome"].lower()]
+                if "siglaPartido" in q:
+                    linhas = [d for d in linhas if d["siglaPartido"] == q["siglaPartido"]]
+            elif len(partes) == 2 and partes[0] == "deputados":
+                dados = api.detalhes(int(partes[1]))
+                n = self._enviar(200 if dados else 404, {"dados": dados, "links": []} if dados else None)
+                api.contar(n)
+                return
+            elif len(partes) == 3 and partes[2] == "despesas":
+                linhas = api.despesas(int(partes[1]), int(q.get("ano", time.localtime().tm_year)))
+            else:
+                api.contar(self._enviar(404, None))
+                return
+
+            itens = int(q.get("itens", 15))
+            pagina = int(q.get("pagina", 1))
+            ultima = max(1, -(-len(linhas) // itens))
+            base = f"http://{self.headers.get('Host')}{url.path}?"
+            links = [
+                {"rel": "self", "href": base + urlencode(q)},
+                {"rel": "first", "href": base + urlencode(dict(q, pagina=1))},
+                {"rel": "last", "href": base + urlencode(dict(q, pagina=ultima))},
+            ]
+            if pagina < ultima:
+                links.append({"rel": "next", "href": base + urlencode(dict(q, pagina=pagina + 1))})
+            api.contar(self._enviar(200, {"dados": linhas[(pagina - 1) * itens:pagina * itens], "links": links}))
+
+    return Handler
+
+
+def start(latencia: float = 0.0, paginas_despesas: int = 5, porta: int = 0) -> tuple[ThreadingHTTPServer, FakeCamara]:
+    """Sobe o servidor numa thread; a URL base é `http://127.0.0.1:<porta>/api/v2`."""
+    api = FakeCamara(latencia, paginas_despesas)
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), _handler(api))
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="fake-camara", daemon=True).start()
+    return servidor, api
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API falsa da Câmara para benchmarks.")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--paginas", type=int, default=5, help="páginas de despesas por (deputado, ano)")
+    args = parser.parse_args()
+    servidor, _ = start(args.latencia_ms / 1000, args.paginas, args.porta)
+    print(f"API falsa em http://127.0.0.1:{servidor.server_port}/api/v2 (Ctrl+C para sair)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
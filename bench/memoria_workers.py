@@ -0,0 +1,129 @@
+"""Memória de N workers lendo o mesmo conjunto de DataFrames de despesas.
+
+Compara o cache compartilhado (`cache_frames`, arquivos Arrow mapeados)
+com uma cópia por processo, como o `st.cache_data` faz (pickle
+desserializado em cada worker). Cada worker é um processo novo que lê os
+mesmos `--frames` DataFrames, percorre as colunas e informa seu PSS
+(memória proporcional: páginas compartilhadas são divididas entre os
+processos que as usam), lido de `/proc/self/smaps_rollup` (Linux).
+
+Uso:
+    python bench/memoria_workers.py --workers 1 2 4 8 --linhas 100000 --saida mem.json
+"""
+import argparse
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(BENCH_DIR)
+MODOS = ["compartilhado", "copia"]
+
+
+def _pss_kb() -> int:
+    with open("/proc/self/smaps_rollup") as f:
+        for linha in f:
+            if linha.startswith("Pss:"):
+                return int(linha.split()[1])
+    raise RuntimeError("sem Pss em smaps_rollup")
+
+
+def _linhas_fixture(n: int) -> list[dict]:
+    with open(os.path.join(BENCH_DIR, "fixtures", "despesas.json"), encoding="utf-8") as f:
+        modelo = json.load(f)
+    return [dict(modelo[i % len(modelo)], codDocumento=i) for i in range(n)]
+
+
+def _preparar(pasta: str, frames: int, linhas: int) -> None:
+    import cache_frames
+    from despesas import normalize_despesas
+
+    df = normalize_despesas(_linhas_fixture(linhas))
+    for i in range(frames):
+        cache_frames.gravar("bench", i, df, ttl=3600)
+        with open(os.path.join(pasta, f"{i}.pkl"), "wb") as f:
+            pickle.dump(df, f)
+
+
+def _worker(modo: str, pasta: str, frames: int, espera: float) -> None:
+    import cache_frames
+
+    base = _pss_kb()
+    mantidos = []
+    for i in range(frames):
+        if modo == "compartilhado":
+            df = cache_frames.ler("bench", i)
+        else:
+            with open(os.path.join(pasta, f"{i}.pkl"), "rb") as f:
+                df = pickle.load(f)
+        # Toca todas as colunas, como a renderização faria
+        for c in df.columns:
+            df[c].iloc[-1]
+        df["valorLiquido"].sum()
+        mantidos.append(df)
+    # Todos os workers vivos ao mesmo tempo, para o PSS dividir as páginas comuns
+    time.sleep(espera)
+    print(json.dumps({"pss_kb": _pss_kb(), "pss_frames_kb": _pss_kb() - base}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memória de vários workers com e sem o cache compartilhado.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--frames", type=int, default=8)
+    parser.add_argument("--linhas", type=int, default=50_000)
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--worker", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    sys.path.insert(0, RAIZ)
+
+    if args.worker:
+        modo, pasta, frames, espera = args.worker
+        _worker(modo, pasta, int(frames), float(espera))
+        return
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CAMARA_FRAMES_DIR"] = os.path.join(tmp, "frames")
+        _preparar(tmp, args.frames, args.linhas)
+        for modo in MODOS:
+            for n in args.workers:
+                espera = 1.0 + 0.5 * n
+                procs = [
+                    subprocess.Popen(
+                        [sys.executable, os.path.abspath(__file__), "--worker", modo, tmp, str(args.frames), str(espera)],
+                        stdout=subprocess.PIPE, text=True, env=os.environ,
+                    )
+                    for _ in range(n)
+                ]
+                saidas = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+                total = sum(s["pss_frames_kb"] for s in saidas)
+                resultados.append({
+                    "modo": modo,
+                    "workers": n,
+                    "pss_frames_total_mb": round(total / 1024, 1),
+                    "pss_frames_por_worker_mb": round(total / 1024 / n, 1),
+                })
+
+    relatorio = {
+        "gerado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "frames": args.frames,
+        "linhas": args.linhas,
+        "resultados": resultados,
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
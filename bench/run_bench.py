@@ -0,0 +1,179 @@
+"""Benchmarks offline de P1.py e P2.py contra a API falsa (`fake_api.py`).
+
+Cada app roda headless pelo `AppTest` do Streamlit, num processo próprio
+com diretórios de cache vazios, e percorre os fluxos principais duas
+vezes: a frio (processo recém-iniciado) e a quente (nova sessão no mesmo
+processo). Para cada fluxo são medidos tempo, requisições HTTP, bytes
+recebidos e pico de memória alocada (tracemalloc). O resultado sai em
+JSON para comparar versões.
+
+Uso:
+    python bench/run_bench.py --latencia-ms 50 --paginas 10 --saida bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(BENCH_DIR)
+APPS = ["P1.py", "P2.py"]
+BUSCA = "Silva"
+
+
+def _stats(api_base: str, zerar: bool = False) -> dict:
+    url = api_base.rsplit("/api/v2", 1)[0] + "/__stats"
+    req = urllib.request.Request(url, method="POST" if zerar else "GET")
+    with urllib.request.urlopen(req) as r:
+        return json.load(r)
+
+
+# Fluxos, na ordem em que são executados; cada um recebe o AppTest já na página certa
+def _busca(at):
+    at.text_input[0].input(BUSCA)
+    at.button[0].click()
+    at.run()
+
+
+def _selecionar_deputado(at):
+    at.selectbox[0].select_index(1)
+    at.run()
+
+
+def _abrir_despesas(at):
+    # Despesas do ano corrente + gráfico anual (P1) ou mensal (P2)
+    next(c for c in at.sidebar.checkbox if c.label == "Mostrar seção de despesas").check()
+    at.run()
+
+
+def _trocar_ano(at):
+    next(s for s in at.selectbox if s.label == "Ano").select_index(1)
+    at.run()
+
+
+FLUXOS = [
+    ("busca", _busca),
+    ("selecionar_deputado", _selecionar_deputado),
+    ("abrir_despesas", _abrir_despesas),
+    ("trocar_ano", _trocar_ano),
+]
+
+
+def _rodar_sessao(app: str, api_base: str, cache: str, medir_memoria: bool) -> list[dict]:
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(RAIZ, app), default_timeout=300)
+    # Sem prefetch (trabalho em segundo plano distorce as medidas) e com a
+    # seção de despesas fechada, para medir cada fluxo separadamente
+    at.session_state["prefetch"] = False
+    at.session_state["mostrar_despesas"] = False
+    at.run()
+
+    resultados = []
+    for nome, fluxo in FLUXOS:
+        _stats(api_base, zerar=True)
+        memoria_antes = 0
+        if medir_memoria:
+            tracemalloc.reset_peak()
+            memoria_antes = tracemalloc.get_traced_memory()[0]
+        inicio = time.perf_counter()
+        fluxo(at)
+        duracao = time.perf_counter() - inicio
+        if at.exception:
+            raise RuntimeError(f"{app}/{nome}: {at.exception[0].value}")
+        resultados.append({
+            "app": app,
+            "fluxo": nome,
+            "cache": cache,
+            "segundos": round(duracao, 4),
+            **_stats(api_base),
+            "pico_memoria_bytes": tracemalloc.get_traced_memory()[1] if medir_memoria else None,
+            # Quanto o fluxo alocou acima do que já estava em uso quando começou
+            "pico_memoria_fluxo_bytes": tracemalloc.get_traced_memory()[1] - memoria_antes if medir_memoria else None,
+        })
+    return resultados
+
+
+def _worker(app: str, api_base: str, medir_memoria: bool) -> None:
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+    if medir_memoria:
+        tracemalloc.start()
+    resultados = _rodar_sessao(app, api_base, "frio", medir_memoria)
+    resultados += _rodar_sessao(app, api_base, "quente", medir_memoria)
+    print(json.dumps(resultados))
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks offline dos apps de deputados.")
+    parser.add_argument("--apps", nargs="+", default=APPS)
+    parser.add_argument("--latencia-ms", type=float, default=30.0)
+    parser.add_argument("--paginas", type=int, default=5, help="páginas de despesas por (deputado, ano)")
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede memória (tracemalloc deixa tudo mais lento)")
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--api", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args.worker, args.api, not args.sem_memoria)
+        return
+
+    sys.path.insert(0, BENCH_DIR)
+    import fake_api
+
+    servidor, _ = fake_api.start(args.latencia_ms / 1000, args.paginas)
+    api_base = f"http://127.0.0.1:{servidor.server_port}/api/v2"
+    resultados = []
+    try:
+        for app in args.apps:
+            with tempfile.TemporaryDirectory() as tmp:
+                env = dict(
+                    os.environ,
+                    CAMARA_API_BASE=api_base,
+                    CAMARA_CACHE_DIR=os.path.join(tmp, "cache"),
+                    CAMARA_DATA_DIR=os.path.join(tmp, "dataset"),
+                )
+                cmd = [sys.executable, os.path.abspath(__file__), "--worker", app, "--api", api_base]
+                if args.sem_memoria:
+                    cmd.append("--sem-memoria")
+                saida = subprocess.run(cmd, env=env, capture_output=True, text=True)
+                if saida.returncode != 0:
+                    sys.exit(f"{app} falhou:\n{saida.stderr}")
+                resultados += json.loads(saida.stdout.strip().splitlines()[-1])
+    finally:
+        servidor.shutdown()
+
+    relatorio = {
+        "gerado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "config": {"latencia_ms": args.latencia_ms, "paginas_despesas": args.paginas, "busca": BUSCA},
+        "resultados": resultados,
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Cache de DataFrames compartilhado entre processos, em arquivos Arrow IPC.
+
+Com vários workers do Streamlit atrás de um balanceador, cada um tinha a
+sua cópia (em `st.cache_data`) dos mesmos DataFrames de despesas. Aqui o
+primeiro worker que monta um DataFrame grava um arquivo Arrow sem
+compressão em `FRAMES_DIR`; os demais o abrem com `memory_map` e montam
+o DataFrame sobre as páginas do arquivo, que ficam uma vez só no cache de
+páginas do sistema, não importa quantos processos leiam. Colunas
+numéricas e de data sem nulos saem sem cópia; texto e categóricas copiam
+só os códigos/offsets necessários.
+
+Cada arquivo leva a validade (`expira_em`) e os `attrs` do DataFrame nos
+metadados do esquema, e é gravado num temporário e trocado com
+`os.replace`, então um leitor nunca vê arquivo pela metade. Arquivos
+vencidos são ignorados e apagados de tempos em tempos.
+
+Desligado com `CAMARA_FRAMES=0` (os apps voltam ao cache em memória,
+`cache_memoria`). Os DataFrames devolvidos apontam para memória somente
+leitura; com o copy-on-write do pandas, alterá-los cria uma cópia.
+"""
+import functools
+import glob
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from typing import Callable, Hashable, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+import metricas
+from despesas_store import CACHE_DIR
+
+ATIVO = os.environ.get("CAMARA_FRAMES", "1") not in ("", "0")
+FRAMES_DIR = os.environ.get("CAMARA_FRAMES_DIR", os.path.join(CACHE_DIR, "frames"))
+# Intervalo mínimo entre varreduras de arquivos vencidos
+INTERVALO_LIMPEZA = 600
+
+_ultima_limpeza = 0.0
+_limpeza_lock = threading.Lock()
+
+
+def _caminho(nome: str, chave: Hashable) -> str:
+    digest = hashlib.blake2b(repr(chave).encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(FRAMES_DIR, nome, f"{digest}.arrow")
+
+
+def ler(nome: str, chave: Hashable) -> Optional[pd.DataFrame]:
+    """DataFrame guardado para `chave`, mapeado do disco; None se ausente ou vencido."""
+    try:
+        fonte = pa.memory_map(_caminho(nome, chave))
+    except FileNotFoundError:
+        return None
+    try:
+        leitor = pa.ipc.open_file(fonte)
+        meta = leitor.schema.metadata or {}
+        if float(meta.get(b"expira_em", 0)) < time.time():
+            return None
+        df = leitor.read_all().to_pandas(split_blocks=True)
+    except (pa.ArrowException, ValueError):
+        # Arquivo de outra versão ou corrompido: trata como ausente, a próxima gravação o substitui
+        return None
+    df.attrs = json.loads(meta.get(b"attrs", b"{}"))
+    return df
+
+
+def gravar(nome: str, chave: Hashable, df: pd.DataFrame, ttl: float) -> None:
+    """Grava `df` para `chave`, válido por `ttl` segundos (troca atômica do arquivo)."""
+    destino = _caminho(nome, chave)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    tabela = tabela.replace_schema_metadata({
+        **(tabela.schema.metadata or {}),
+        b"expira_em": str(time.time() + ttl).encode(),
+        b"attrs": json.dumps(df.attrs).encode("utf-8"),
+    })
+    tmp = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with pa.OSFile(tmp, "wb") as f, pa.ipc.new_file(f, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        os.replace(tmp, destino)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    _limpar_se_preciso()
+
+
+def limpar() -> int:
+    """Apaga arquivos vencidos (e temporários esquecidos); devolve quantos apagou."""
+    apagados = 0
+    for arquivo in glob.glob(os.path.join(FRAMES_DIR, "*", "*.arrow")):
+        try:
+            with pa.memory_map(arquivo) as fonte:
+                meta = pa.ipc.open_file(fonte).schema.metadata or {}
+            vencido = float(meta.get(b"expira_em", 0)) < time.time()
+        except (OSError, pa.ArrowException, ValueError):
+            vencido = True
+        if vencido:
+            try:
+                os.remove(arquivo)
+                apagados += 1
+            except OSError:
+                pass
+    for tmp in glob.glob(os.path.join(FRAMES_DIR, "*", "*.tmp")):
+        try:
+            if time.time() - os.path.getmtime(tmp) > INTERVALO_LIMPEZA:
+                os.remove(tmp)
+                apagados += 1
+        except OSError:
+            pass
+    return apagados
+
+
+def _limpar_se_preciso() -> None:
+    global _ultima_limpeza
+    with _limpeza_lock:
+        if time.time() - _ultima_limpeza < INTERVALO_LIMPEZA:
+            return
+        _ultima_limpeza = time.time()
+    limpar()
+
+
+def compartilhado(nome: str, ttl: float) -> Callable[[Callable[..., pd.DataFrame]], Callable[..., pd.DataFrame]]:
+    """Decorador: devolve o DataFrame do cache compartilhado ou chama a função e grava o resultado.
+
+    A chave são os argumentos da chamada (com os padrões preenchidos). Se
+    o disco falhar, a chamada segue normalmente, só sem cache.
+    """
+    def decorador(fn: Callable[..., pd.DataFrame]) -> Callable[..., pd.DataFrame]:
+        assinatura = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs) -> pd.DataFrame:
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            chave = tuple(argumentos.arguments.items())
+            df = ler(nome, chave)
+            if metricas.ATIVO:
+                metricas.incrementar("camara_frames_total", funcao=nome, resultado="hit" if df is not None else "miss")
+            if df is not None:
+                return df
+            df = fn(*args, **kwargs)
+            try:
+                gravar(nome, chave, df, ttl)
+            except (OSError, pa.ArrowException):
+                pass
+            return df
+
+        return wrapper
+    return decorador
@@ -0,0 +1,243 @@
+"""Cache em memória dos fetchers, com teto de bytes.
+
+Substitui o `st.cache_data` nos apps: as entradas (um dict de detalhes,
+um DataFrame de milhares de linhas, um ZIP) têm tamanhos muito
+diferentes, e um limite por número de entradas não segura a memória do
+worker. Aqui cada entrada é medida ao entrar (`tamanho`), o processo tem
+um orçamento total (`ORCAMENTO_BYTES`) e cada função pode ter uma cota,
+em fração do orçamento. Ao passar de um limite, sai a maior entre as
+`AMOSTRA` menos usadas recentemente: um LRU que prefere liberar muito de
+uma vez a descartar várias entradas pequenas e quentes. Uma entrada
+maior que a cota não fica em cache.
+
+O orçamento vale para todos os caches em memória do processo: além dos
+fetchers decorados com `limitado`, guardam aqui (com `guardar`) o memo
+de `normalize_despesas`, as respostas revalidáveis de `camara_api` e os
+PNGs de `graficos`. O roster e o índice de fornecedores, que o processo
+mantém de qualquer forma, entram com `reservar`: contam no total e
+empurram os demais para fora, mas não são descartados. Só os arquivos
+mapeados de `cache_frames` ficam de fora (são páginas do sistema,
+compartilhadas entre processos).
+
+`estatisticas()` mostra bytes, entradas, acertos, faltas e descartes por
+cache (o painel de diagnóstico dos apps exibe a tabela).
+
+Diferente do `st.cache_data`, o valor devolvido é o próprio objeto
+guardado, sem cópia; os DataFrames são protegidos pelo copy-on-write do
+pandas, e dicts e listas não devem ser alterados por quem chama.
+"""
+import functools
+import inspect
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+import pandas as pd
+
+import metricas
+from singleflight import SingleFlight
+
+ORCAMENTO_BYTES = int(os.environ.get("CAMARA_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Entre quantas das menos usadas recentemente se escolhe a maior para descartar
+AMOSTRA = 8
+
+
+class _Entrada(NamedTuple):
+    valor: Any
+    bytes: int
+    expira_em: float
+    fixa: bool = False
+
+
+def tamanho(valor: Any) -> int:
+    """Bytes aproximados que `valor` ocupa em memória."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(index=True, deep=True)
+        return int(uso.sum() if isinstance(valor, pd.DataFrame) else uso)
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return len(valor)
+    try:
+        return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(valor)
+
+
+def _chave_arg(valor: Any) -> Hashable:
+    # DataFrames (ex.: a tabela exportada) entram na chave pelo conteúdo
+    if isinstance(valor, pd.DataFrame):
+        return ("DataFrame", tuple(valor.columns), int(pd.util.hash_pandas_object(valor).sum()))
+    return valor
+
+
+class CacheLimitado:
+    """LRU com orçamento de bytes para o processo e cotas por função."""
+
+    def __init__(self, orcamento: int = ORCAMENTO_BYTES):
+        self.orcamento = orcamento
+        self._entradas: OrderedDict[tuple[str, Hashable], _Entrada] = OrderedDict()
+        self._cotas: dict[str, Optional[int]] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def registrar(self, nome: str, cota: Optional[float] = None) -> None:
+        with self._lock:
+            self._cotas[nome] = int(cota * self.orcamento) if cota is not None else None
+            self._stats.setdefault(
+                nome, {"bytes": 0, "entradas": 0, "acertos": 0, "faltas": 0, "descartes": 0, "expiradas": 0}
+            )
+
+    def obter(self, nome: str, chave: Hashable) -> tuple[bool, Any]:
+        with self._lock:
+            entrada = self._entradas.get((nome, chave))
+            if entrada is not None and entrada.expira_em < time.monotonic():
+                self._remover((nome, chave))
+                self._stats[nome]["expiradas"] += 1
+                entrada = None
+            if entrada is None:
+                self._stats[nome]["faltas"] += 1
+                return False, None
+            self._entradas.move_to_end((nome, chave))
+            self._stats[nome]["acertos"] += 1
+            return True, entrada.valor
+
+    def guardar(self, nome: str, chave: Hashable, valor: Any, ttl: Optional[float], n: Optional[int] = None) -> None:
+        n = tamanho(valor) if n is None else n
+        expira_em = time.monotonic() + ttl if ttl is not None else float("inf")
+        with self._lock:
+            cota = self._cotas.get(nome)
+            if n > self.orcamento or (cota is not None and n > cota):
+                if (nome, chave) in self._entradas:
+                    self._remover((nome, chave))
+                return
+            self._inserir((nome, chave), _Entrada(valor, n, expira_em))
+            if cota is not None:
+                while self._stats[nome]["bytes"] > cota and self._descartar(nome, (nome, chave)):
+                    pass
+            while self._bytes > self.orcamento:
+                if not self._descartar(None, (nome, chave)):
+                    # Só sobrou a nova (e memória reservada): ela não fica
+                    self._remover((nome, chave))
+                    break
+
+    def reservar(self, nome: str, chave: Hashable, n: int) -> None:
+        """Conta `n` bytes de um objeto mantido fora do cache (ex.: um índice); nunca é descartado."""
+        with self._lock:
+            self._inserir((nome, chave), _Entrada(None, n, float("inf"), fixa=True))
+            while self._bytes > self.orcamento and self._descartar(None, (nome, chave)):
+                pass
+
+    def _inserir(self, k: tuple[str, Hashable], entrada: _Entrada) -> None:
+        if k in self._entradas:
+            self._remover(k)
+        self._entradas[k] = entrada
+        self._bytes += entrada.bytes
+        self._stats[k[0]]["bytes"] += entrada.bytes
+        self._stats[k[0]]["entradas"] += 1
+
+    def _remover(self, k: tuple[str, Hashable]) -> _Entrada:
+        entrada = self._entradas.pop(k)
+        self._bytes -= entrada.bytes
+        self._stats[k[0]]["bytes"] -= entrada.bytes
+        self._stats[k[0]]["entradas"] -= 1
+        return entrada
+
+    def _descartar(self, nome: Optional[str], nova: tuple[str, Hashable]) -> bool:
+        """Tira a maior entre as `AMOSTRA` menos recentes (da função `nome`, ou de todas), fora a `nova` e as fixas."""
+        candidatos = []
+        for k, entrada in self._entradas.items():
+            if k != nova and not entrada.fixa and (nome is None or k[0] == nome):
+                candidatos.append((entrada.bytes, k))
+                if len(candidatos) == AMOSTRA:
+                    break
+        if not candidatos:
+            return False
+        _, vitima = max(candidatos, key=lambda c: c[0])
+        self._remover(vitima)
+        self._stats[vitima[0]]["descartes"] += 1
+        if metricas.ATIVO:
+            metricas.incrementar("camara_cache_descartes_total", funcao=vitima[0])
+        return True
+
+    def limpar(self) -> None:
+        with self._lock:
+            for k, entrada in list(self._entradas.items()):
+                if not entrada.fixa:
+                    self._remover(k)
+
+    def estatisticas(self) -> list[dict]:
+        with self._lock:
+            linhas = [
+                {"funcao": nome, "cota_bytes": self._cotas.get(nome), **stats}
+                for nome, stats in sorted(self._stats.items())
+            ]
+            total = {"funcao": "(total)", "cota_bytes": self.orcamento, "bytes": self._bytes, "entradas": len(self._entradas)}
+        return linhas + [total]
+
+
+_cache = CacheLimitado()
+_voos = SingleFlight()
+
+
+def limitado(
+    nome: str, ttl: Optional[float] = None, cota: Optional[float] = None
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorador: guarda o resultado no cache do processo por `ttl` segundos.
+
+    `cota` é a fração do orçamento que a função pode ocupar (ex.: 0.5).
+    A chave são os argumentos (com os padrões preenchidos); chamadas
+    iguais ao mesmo tempo executam a função uma vez só. Exceções não vão
+    para o cache.
+    """
+    _cache.registrar(nome, cota)
+
+    def decorador(fn: Callable[..., Any]) -> Callable[..., Any]:
+        assinatura = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs) -> Any:
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            chave = tuple((k, _chave_arg(v)) for k, v in argumentos.arguments.items())
+            achou, valor = _cache.obter(nome, chave)
+            if achou:
+                return valor
+
+            def executar() -> Any:
+                resultado = fn(*args, **kwargs)
+                _cache.guardar(nome, chave, resultado, ttl)
+                return resultado
+
+            return _voos.executar((nome, chave), executar)
+
+        return wrapper
+    return decorador
+
+
+def registrar(nome: str, cota: Optional[float] = None) -> None:
+    """Registra um cache do processo que guarda entradas com `guardar` (cota em fração do orçamento)."""
+    _cache.registrar(nome, cota)
+
+
+def obter(nome: str, chave: Hashable) -> tuple[bool, Any]:
+    """`(True, valor)` se `chave` está no cache `nome`; `(False, None)` se não."""
+    return _cache.obter(nome, chave)
+
+
+def guardar(nome: str, chave: Hashable, valor: Any, n: Optional[int] = None) -> None:
+    """Guarda `valor` (de `n` bytes, medido com `tamanho` se omitido) no cache `nome`, sem validade."""
+    _cache.guardar(nome, chave, valor, None, n)
+
+
+def reservar(nome: str, chave: Hashable, n: int) -> None:
+    """Desconta do orçamento os `n` bytes de um objeto que o processo mantém (substitui a reserva anterior)."""
+    _cache.reservar(nome, chave, n)
+
+
+def estatisticas() -> list[dict]:
+    """Bytes, entradas, acertos, faltas, descartes e expiradas por função, mais o total."""
+    return _cache.estatisticas()
@@ -0,0 +1,468 @@
+"""Cliente HTTP compartilhado para a API de Dados Abertos da Câmara.
+
+Todos os fetchers dos apps passam por aqui: uma única `requests.Session`
+por processo, com pool de conexões keep-alive, gzip e retry com backoff
+para erros 5xx e conexões derrubadas. As saídas para a API passam por um
+token bucket do processo (que também pausa todo mundo quando a API
+responde 429), e GETs idênticos em andamento são feitos uma vez só.
+
+Respostas recentes ficam guardadas com seus validadores (ETag e
+Last-Modified) e revalidadas com GET condicional: um 304, ou um corpo
+com o mesmo hash do guardado, devolve o objeto já decodificado, sem
+baixar nem decodificar de novo.
+"""
+import hashlib
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Generator, Hashable, Iterator, Optional, TypeVar
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import cache_memoria
+import metricas
+from singleflight import SingleFlight
+
+API_BASE = os.environ.get("CAMARA_API_BASE", "https://dadosabertos.camara.leg.br/api/v2")
+HEADERS = {
+    "User-Agent": "Streamlit Busca Deputado/2.6",
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+}
+TIMEOUT = 30
+
+# Ajustáveis por variável de ambiente (ex.: CAMARA_POOL_SIZE=32 em produção)
+POOL_SIZE = int(os.environ.get("CAMARA_POOL_SIZE", "16"))
+MAX_RETRIES = int(os.environ.get("CAMARA_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.environ.get("CAMARA_BACKOFF", "0.5"))
+RETRY_STATUS = (500, 502, 503, 504)
+# Limite de requisições por segundo do processo (0 desliga) e rajada máxima
+RATE_LIMIT = float(os.environ.get("CAMARA_RATE_LIMIT", "10"))
+RATE_BURST = int(os.environ.get("CAMARA_RATE_BURST", "20"))
+# Fração da rajada que o segundo plano (prefetch) não pode consumir: fica para o usuário
+RESERVA_PRIMEIRO_PLANO = 0.5
+# Teto da espera pedida num 429 (Retry-After)
+MAX_RETRY_AFTER = 60.0
+# Respostas guardadas para revalidação condicional (uma por path + params), teto em bytes
+VALIDADORES_MAX_BYTES = int(os.environ.get("CAMARA_VALIDADORES_MAX_BYTES", str(32 * 1024 * 1024)))
+# O JSON decodificado ocupa por volta de 2 a 3 vezes o corpo da resposta
+EXPANSAO_JSON = 3
+
+# Paginação: itens por página, limite de segurança e paralelismo por consulta
+PAGE_SIZE = 100
+MAX_PAGES = 50
+PAGE_WORKERS = int(os.environ.get("CAMARA_PAGE_WORKERS", "8"))
+# Anos buscados ao mesmo tempo nas agregações anuais
+YEAR_WORKERS = int(os.environ.get("CAMARA_YEAR_WORKERS", "4"))
+
+T = TypeVar("T")
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# Requisições em segundo plano (prefetch) não contam como "em voo"
+_local = threading.local()
+# Intervalo entre verificações do segundo plano enquanto o primeiro está ocupado
+ESPERA_OCIOSO = 0.05
+_em_voo = 0
+_em_voo_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Limite de taxa compartilhado: `taxa` fichas por segundo, até `capacidade` acumuladas."""
+
+    def __init__(self, taxa: float = RATE_LIMIT, capacidade: int = RATE_BURST):
+        self.taxa = taxa
+        self.capacidade = max(1, capacidade)
+        self._fichas = float(self.capacidade)
+        self._atualizado = time.monotonic()
+        self._pausa_ate = 0.0
+        self._lock = threading.Lock()
+
+    def adquirir(self, reserva: float = 0.0) -> None:
+        """Espera até haver uma ficha (e a pausa de um 429 acabar) e a consome.
+
+        Com `reserva`, só consome se sobrarem ao menos `reserva` fichas
+        depois (limitada a `capacidade - 1`, para que sempre seja possível).
+        """
+        minimo = 1 + min(reserva, self.capacidade - 1)
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                if self.taxa > 0:
+                    self._fichas = min(self.capacidade, self._fichas + (agora - self._atualizado) * self.taxa)
+                self._atualizado = agora
+                if agora >= self._pausa_ate and (self.taxa <= 0 or self._fichas >= minimo):
+                    self._fichas -= 1
+                    return
+                espera = max(self._pausa_ate - agora, (minimo - self._fichas) / self.taxa if self.taxa > 0 else 0.0)
+            time.sleep(espera)
+
+    def pausar(self, segundos: float) -> None:
+        """Ninguém sai por `segundos`; depois recomeça sem rajada acumulada."""
+        with self._lock:
+            self._pausa_ate = max(self._pausa_ate, time.monotonic() + segundos)
+            self._fichas = 0.0
+
+
+_limite = TokenBucket()
+_voos = SingleFlight()
+
+# chave -> (etag, last_modified, hash do corpo, JSON decodificado, bytes estimados), no orçamento de cache_memoria
+Guardado = tuple[Optional[str], Optional[str], bytes, Any, int]
+cache_memoria.registrar("validadores_http", min(1.0, VALIDADORES_MAX_BYTES / cache_memoria.ORCAMENTO_BYTES))
+
+
+def _guardado(chave: Hashable) -> Optional[Guardado]:
+    return cache_memoria.obter("validadores_http", chave)[1]
+
+
+def _guardar(chave: Hashable, entrada: Guardado) -> None:
+    cache_memoria.guardar("validadores_http", chave, entrada, entrada[4])
+
+
+def _build_session(pool_size: int) -> requests.Session:
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset({"GET"}),
+        # Esgotadas as tentativas, devolve a resposta para o raise_for_status
+        raise_on_status=False,
+        # 429 com Retry-After fica com _get, que pausa o processo todo (com teto de MAX_RETRY_AFTER)
+        respect_retry_after_header=False,
+    )
+    # pool_block: acima de pool_size conexões simultâneas, espera em vez de abrir conexões descartáveis
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+    s = requests.Session()
+    s.headers.update(HEADERS)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+def get_session() -> requests.Session:
+    """Sessão compartilhada do processo (criada na primeira chamada)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(POOL_SIZE)
+    return _session
+
+
+def configure_session(pool_size: int) -> None:
+    """Recria a sessão compartilhada com outro tamanho de pool."""
+    global _session, POOL_SIZE
+    with _session_lock:
+        POOL_SIZE = pool_size
+        old, _session = _session, _build_session(pool_size)
+    if old is not None:
+        old.close()
+
+
+def configure_rate_limit(taxa: float, capacidade: int = RATE_BURST) -> None:
+    """Troca o limite de requisições por segundo do processo (0 desliga)."""
+    global _limite, RATE_LIMIT, RATE_BURST
+    RATE_LIMIT, RATE_BURST = taxa, capacidade
+    _limite = TokenBucket(taxa, capacidade)
+
+
+class Cancelado(requests.RequestException):
+    """Requisição de segundo plano cancelada por quem a agendou."""
+
+
+@contextmanager
+def background(ativo: bool = True, cancelado: Optional[threading.Event] = None) -> Iterator[None]:
+    """Marca as requisições desta thread como de segundo plano.
+
+    Elas esperam o primeiro plano ficar ocioso antes de cada requisição,
+    não consomem a reserva de fichas do usuário e, se `cancelado` for
+    acionado, levantam `Cancelado` na próxima requisição.
+    """
+    anterior = (getattr(_local, "background", False), getattr(_local, "cancelado", None))
+    _local.background, _local.cancelado = ativo, cancelado
+    try:
+        yield
+    finally:
+        _local.background, _local.cancelado = anterior
+
+
+def is_background() -> bool:
+    return getattr(_local, "background", False)
+
+
+def _esperar_vez() -> None:
+    """Segundo plano: espera o primeiro plano ficar ocioso; levanta `Cancelado` se cancelado."""
+    cancelado = getattr(_local, "cancelado", None)
+    while True:
+        if cancelado is not None and cancelado.is_set():
+            raise Cancelado("tarefa de segundo plano cancelada")
+        if foreground_idle():
+            return
+        time.sleep(ESPERA_OCIOSO)
+
+
+def foreground_idle() -> bool:
+    """True quando nenhuma requisição de primeiro plano está em andamento."""
+    return _em_voo == 0
+
+
+def _retry_after(r: requests.Response, tentativa: int) -> float:
+    """Segundos a esperar após um 429: `Retry-After` (segundos ou data) ou backoff exponencial."""
+    valor = r.headers.get("Retry-After", "").strip()
+    espera = None
+    if valor.isdigit():
+        espera = float(valor)
+    elif valor:
+        try:
+            espera = parsedate_to_datetime(valor).timestamp() - time.time()
+        except (TypeError, ValueError):
+            pass
+    if espera is None:
+        espera = BACKOFF_FACTOR * 2 ** tentativa
+    return min(max(espera, 0.0), MAX_RETRY_AFTER)
+
+
+def _get(path: str, params: Optional[dict], chave: Hashable) -> Any:
+    guardado = _guardado(chave) if VALIDADORES_MAX_BYTES > 0 else None
+    condicionais = {}
+    if guardado is not None:
+        etag, modificado = guardado[:2]
+        if etag:
+            condicionais["If-None-Match"] = etag
+        if modificado:
+            condicionais["If-Modified-Since"] = modificado
+    reserva = RESERVA_PRIMEIRO_PLANO * _limite.capacidade if is_background() else 0.0
+    for tentativa in range(MAX_RETRIES + 1):
+        _limite.adquirir(reserva)
+        inicio = time.perf_counter() if metricas.ATIVO else 0.0
+        status, n_bytes = "erro", 0
+        try:
+            r = get_session().get(f"{API_BASE}{path}", params=params, headers=condicionais, timeout=TIMEOUT)
+            if metricas.ATIVO:
+                status = str(r.status_code)
+                # Bytes recebidos (comprimidos, quando o servidor manda o tamanho)
+                n_bytes = int(r.headers.get("Content-Length") or len(r.content))
+        finally:
+            if metricas.ATIVO:
+                metricas.registrar_http(path, status, time.perf_counter() - inicio, n_bytes)
+        if r.status_code != 429 or tentativa == MAX_RETRIES:
+            break
+        # Rate limit da API: segura todas as requisições do processo, não só esta
+        _limite.pausar(_retry_after(r, tentativa))
+    if r.status_code == 304 and guardado is not None:
+        etag, modificado, digest, dados, n = guardado
+        _guardar(chave, (r.headers.get("ETag") or etag, r.headers.get("Last-Modified") or modificado, digest, dados, n))
+        return dados
+    r.raise_for_status()
+    if VALIDADORES_MAX_BYTES <= 0:
+        return r.json()
+    # Sem validadores (ou servidor que os ignora): mesmo corpo, mesmo objeto decodificado
+    digest = hashlib.blake2b(r.content, digest_size=16).digest()
+    dados = guardado[3] if guardado is not None and guardado[2] == digest else r.json()
+    _guardar(chave, (r.headers.get("ETag"), r.headers.get("Last-Modified"), digest, dados, EXPANSAO_JSON * len(r.content)))
+    return dados
+
+
+def api_get(path: str, params: Optional[dict] = None) -> dict:
+    """GET em `API_BASE + path`; devolve o JSON ou levanta `requests.RequestException`.
+
+    Chamadas com o mesmo `path` e `params` ao mesmo tempo (de qualquer
+    sessão) compartilham uma única requisição e recebem o mesmo objeto,
+    que não deve ser alterado. O mesmo vale para respostas revalidadas,
+    que devolvem o objeto guardado da vez anterior.
+    """
+    global _em_voo
+    primeiro_plano = not is_background()
+    if primeiro_plano:
+        with _em_voo_lock:
+            _em_voo += 1
+    else:
+        _esperar_vez()
+    try:
+        chave = (path, tuple(sorted((params or {}).items())))
+        return _voos.executar(chave, lambda: _get(path, params, chave))
+    finally:
+        if primeiro_plano:
+            with _em_voo_lock:
+                _em_voo -= 1
+
+
+def _link_page(links: list, rel: str) -> Optional[int]:
+    """Número da página apontada pelo link `rel` (ex.: "last"), se houver."""
+    for link in links:
+        if link.get("rel") == rel:
+            try:
+                return int(parse_qs(urlparse(link.get("href", "")).query)["pagina"][0])
+            except (KeyError, IndexError, ValueError):
+                return None
+    return None
+
+
+def iter_pages(
+    path: str, params: Optional[dict] = None, max_pages: int = MAX_PAGES
+) -> Generator[tuple[int, Optional[int], list[dict]], None, bool]:
+    """Versão em fluxo de `fetch_pages`: produz `(página, total, dados)` na ordem.
+
+    `total` é o número de páginas que serão lidas (None quando a API não
+    manda o link "last"). O valor de retorno do gerador diz se o resultado
+    foi truncado em `max_pages`.
+    """
+    base = dict(params or {}, itens=PAGE_SIZE)
+    fundo, cancelado = is_background(), getattr(_local, "cancelado", None)
+
+    def pagina(n: int) -> dict:
+        # As threads do pool herdam a marcação de segundo plano (e o cancelamento) de quem chamou
+        with background(fundo, cancelado):
+            return api_get(path, dict(base, pagina=n))
+
+    lidas = 0
+    try:
+        resp = pagina(1)
+        links = resp.get("links", [])
+        ultima = _link_page(links, "last")
+
+        if ultima is None:
+            # Sem link "last": segue os links "next" um a um
+            lidas = 1
+            yield 1, None, resp.get("dados", [])
+            n = 1
+            while any(l.get("rel") == "next" for l in links):
+                if n >= max_pages:
+                    return True
+                n += 1
+                resp = pagina(n)
+                lidas = n
+                yield n, None, resp.get("dados", [])
+                links = resp.get("links", [])
+            return False
+
+        n_paginas = min(ultima, max_pages)
+        lidas = 1
+        yield 1, n_paginas, resp.get("dados", [])
+        if n_paginas > 1:
+            # Em segundo plano, uma página por vez
+            workers = 1 if fundo else min(PAGE_WORKERS, n_paginas - 1)
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                for n, resto in enumerate(ex.map(pagina, range(2, n_paginas + 1)), start=2):
+                    lidas = n
+                    yield n, n_paginas, resto.get("dados", [])
+        return ultima > max_pages
+    finally:
+        if metricas.ATIVO:
+            metricas.observar("camara_paginas_por_consulta", lidas, endpoint=metricas.endpoint(path))
+
+
+def fetch_pages(path: str, params: Optional[dict] = None, max_pages: int = MAX_PAGES) -> tuple[list[dict], bool]:
+    """Busca todas as páginas de um endpoint paginado.
+
+    A página 1 informa a última página (link "last"); as demais são buscadas
+    em paralelo e concatenadas na ordem. Devolve `(dados, truncado)`, com
+    `truncado=True` quando o resultado passou de `max_pages` páginas.
+    """
+    dados: list[dict] = []
+    paginas = iter_pages(path, params, max_pages)
+    while True:
+        try:
+            _, _, pagina = next(paginas)
+        except StopIteration as fim:
+            return dados, fim.value
+        dados.extend(pagina)
+
+
+def _despesas_params(ano: Optional[int]) -> dict:
+    params = {"ordem": "DESC", "ordenarPor": "dataDocumento"}
+    if ano is not None:
+        params["ano"] = ano
+    return params
+
+
+def fetch_despesas(dep_id: int, ano: Optional[int] = None) -> tuple[list[dict], bool]:
+    """Despesas do deputado (mais recentes primeiro); devolve `(dados, truncado)`."""
+    return fetch_pages(f"/deputados/{dep_id}/despesas", _despesas_params(ano))
+
+
+def fetch_despesas_recentes(
+    dep_id: int, ano: int, conhecido: Callable[[dict], bool], max_pages: int = MAX_PAGES
+) -> tuple[list[dict], str]:
+    """Despesas mais recentes, uma página por vez, até chegar a documentos já conhecidos.
+
+    Para na página em que aparece um documento para o qual `conhecido` é
+    verdadeiro, ou numa seguinte, quando a página já termina numa data
+    anterior à dele: documentos da mesma data podem vir em qualquer ordem,
+    então um novo empatado com o conhecido não fica para trás. Devolve
+    `(dados, parada)`: `"conhecido"` nesse caso, `"fim"` se as páginas
+    acabaram antes (os dados são o resultado inteiro) e `"limite"` se
+    passou de `max_pages` sem parar.
+    """
+    path = f"/deputados/{dep_id}/despesas"
+    base = dict(_despesas_params(ano), itens=PAGE_SIZE)
+    dados: list[dict] = []
+    # Data do primeiro documento conhecido encontrado
+    marco: Optional[str] = None
+    for n in range(1, max_pages + 1):
+        resp = api_get(path, dict(base, pagina=n))
+        pagina = resp.get("dados", [])
+        dados.extend(pagina)
+        if marco is None:
+            marco = next((d.get("dataDocumento") or "" for d in pagina if conhecido(d)), None)
+        if marco is not None and pagina and (pagina[-1].get("dataDocumento") or "") < marco:
+            return dados, "conhecido"
+        if not any(l.get("rel") == "next" for l in resp.get("links", [])):
+            return dados, "fim"
+    return dados, "limite"
+
+
+def iter_despesas(dep_id: int, ano: Optional[int] = None) -> Generator[tuple[int, Optional[int], list[dict]], None, bool]:
+    """Despesas do deputado página a página (ver `iter_pages`)."""
+    return (yield from iter_pages(f"/deputados/{dep_id}/despesas", _despesas_params(ano)))
+
+
+def fan_out(
+    tarefas: dict[str, Callable[[], Any]], fluxos: Optional[dict[str, Callable[[], Iterator]]] = None
+) -> Iterator[tuple[str, Any, Optional[Future]]]:
+    """Roda tarefas e fluxos ao mesmo tempo, devolvendo eventos na ordem em que acontecem.
+
+    Cada tarefa gera um evento `(nome, None, future)` ao terminar. Cada
+    fluxo (função que devolve um gerador) gera `(nome, item, None)` para
+    cada item produzido e, no fim, `(nome, None, future)` com o valor de
+    retorno do gerador. Se quem consome parar antes do fim, as tarefas que
+    ainda não começaram são canceladas.
+    """
+    fluxos = fluxos or {}
+    eventos: queue.Queue = queue.Queue()
+
+    def consumir(nome: str, fabrica: Callable[[], Iterator]) -> Any:
+        gerador = fabrica()
+        while True:
+            try:
+                item = next(gerador)
+            except StopIteration as fim:
+                return fim.value
+            eventos.put((nome, item, None))
+
+    ex = ThreadPoolExecutor(max_workers=max(1, len(tarefas) + len(fluxos)))
+    try:
+        for nome, fn in tarefas.items():
+            ex.submit(fn).add_done_callback(lambda f, nome=nome: eventos.put((nome, None, f)))
+        for nome, fabrica in fluxos.items():
+            ex.submit(consumir, nome, fabrica).add_done_callback(lambda f, nome=nome: eventos.put((nome, None, f)))
+        pendentes = len(tarefas) + len(fluxos)
+        while pendentes:
+            evento = eventos.get()
+            if evento[2] is not None:
+                pendentes -= 1
+            yield evento
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,125 @@
+"""Camada de dados dos apps: deputados e despesas, sem Streamlit.
+
+Estas funções não fazem cache de sessão nem desenham nada; P1.py e P2.py
+as envolvem com os caches (`cache_memoria`, `cache_frames`) e cuidam da
+página. Scripts, notebooks e jobs podem importar este módulo sem subir a
+interface.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Generator, Iterable, Optional
+
+import pandas as pd
+import requests
+
+import despesas_store
+from camara_api import YEAR_WORKERS, api_get
+from despesas import COLUNAS_CATEGORIA, agrega_cubo, normalize_despesas
+from roster import get_roster
+
+
+def search_deputados_by_name(nome: str) -> list[dict]:
+    """Busca por nome no roster local (ignora acentos e maiúsculas)."""
+    return get_roster().buscar(nome)
+
+
+def get_deputado_details(dep_id: int) -> dict:
+    return api_get(f"/deputados/{dep_id}").get("dados", {})
+
+
+def get_despesas(dep_id: int, ano: Optional[int] = None) -> pd.DataFrame:
+    """Busca despesas do deputado (via armazenamento local) e retorna DataFrame tipado."""
+    dados, truncado = despesas_store.load_or_fetch(dep_id, ano)
+    return normalize_despesas(dados, truncado, chave=(dep_id, ano))
+
+
+def stream_despesas(
+    dep_id: int, ano: Optional[int] = None
+) -> Generator[tuple[int, Optional[int], list[dict]], None, pd.DataFrame]:
+    """Versão em fluxo de get_despesas: produz as páginas conforme chegam e devolve o mesmo DataFrame."""
+    dados, truncado = yield from despesas_store.iter_load_or_fetch(dep_id, ano)
+    return normalize_despesas(dados, truncado, chave=(dep_id, ano))
+
+
+def get_cubo(
+    dep_id: int, ano: int, carregar: Callable[[int, int], pd.DataFrame] = get_despesas
+) -> pd.DataFrame:
+    """Totais do ano por mês e tipo de despesa (`despesas.CHAVES_CUBO`).
+
+    Vem pronto do armazenamento local quando existe; senão as despesas são
+    carregadas com `carregar(dep_id, ano)`, o que grava o cubo ao buscar na
+    API, e agregadas aqui se ainda assim faltar (dados salvos antes do cubo).
+    """
+    cubo = despesas_store.load_cubo(dep_id, ano)
+    if cubo is None:
+        df = carregar(dep_id, ano)
+        cubo = despesas_store.load_cubo(dep_id, ano)
+        if cubo is None:
+            cubo = agrega_cubo(df.assign(dep_id=dep_id))
+    return cubo
+
+
+def total_liquido_ano(dep_id: int, ano: int) -> float:
+    return float(get_cubo(dep_id, ano)["valorLiquido"].sum())
+
+
+def get_despesas_por_ano(
+    dep_id: int,
+    ano_ini: int = 2015,
+    ano_fim: Optional[int] = None,
+    max_workers: int = YEAR_WORKERS,
+    total_ano: Callable[[int, int], float] = total_liquido_ano,
+) -> pd.DataFrame:
+    """Agrega despesas por ano (valor líquido) para o deputado selecionado.
+
+    Os anos são buscados em paralelo (até `max_workers` por vez) com
+    `total_ano(dep_id, ano)`, que os apps trocam pela versão em cache. Um
+    ano que falhar não derruba o resultado: volta com `Erro=True` e total
+    zerado.
+    """
+    if ano_fim is None:
+        ano_fim = datetime.now().year
+    anos = range(ano_ini, ano_fim + 1)
+    rows = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futuros = {ex.submit(total_ano, dep_id, ano): ano for ano in anos}
+        for fut in as_completed(futuros):
+            ano = futuros[fut]
+            try:
+                rows[ano] = {"Ano": ano, "TotalLiquido": fut.result(), "Erro": False}
+            except requests.RequestException:
+                rows[ano] = {"Ano": ano, "TotalLiquido": 0.0, "Erro": True}
+    return pd.DataFrame([rows[ano] for ano in anos])
+
+
+def get_despesas_varios(
+    dep_ids: Iterable[int],
+    anos: Iterable[int],
+    max_workers: int = YEAR_WORKERS,
+    carregar: Callable[[int, int], pd.DataFrame] = get_despesas,
+) -> pd.DataFrame:
+    """Despesas de vários deputados e anos num único DataFrame, com a coluna `dep_id`.
+
+    Cada par (deputado, ano) é uma tarefa de `carregar(dep_id, ano)`, até
+    `max_workers` ao mesmo tempo. Pares que falharem ficam de fora e são
+    listados em `df.attrs["falhas"]`.
+    """
+    pares = [(dep_id, ano) for dep_id in dep_ids for ano in anos]
+    partes, falhas = {}, []
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futuros = {ex.submit(carregar, dep_id, ano): (dep_id, ano) for dep_id, ano in pares}
+        for fut in as_completed(futuros):
+            try:
+                partes[futuros[fut]] = fut.result()
+            except requests.RequestException:
+                falhas.append(futuros[fut])
+    frames = [partes[p].assign(dep_id=p[0]) for p in pares if p in partes and not partes[p].empty]
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+        # Categorias diferentes entre as partes viram texto no concat; volta para categórica
+        for c in COLUNAS_CATEGORIA:
+            df[c] = df[c].astype("category")
+    else:
+        df = normalize_despesas([]).assign(dep_id=pd.Series(dtype="int64"))
+    df.attrs["falhas"] = sorted(falhas)
+    return df
@@ -0,0 +1,142 @@
+"""Esquema do DataFrame de despesas usado pelos apps.
+
+`normalize_despesas` roda uma vez, dentro do fetch em cache: valores em
+float, `dataDocumento` em datetime, `ano`/`mes` inteiros e as colunas de
+texto repetitivas como categóricas. O código de exibição conta com esse
+esquema e não converte mais nada a cada rerun.
+"""
+import hashlib
+import os
+import pickle
+from typing import Hashable, NamedTuple, Optional
+
+import pandas as pd
+
+import cache_memoria
+
+# Colunas exibidas (e exportadas) na seção de despesas, sempre presentes
+COLUNAS_DESPESAS = [
+    "ano", "mes", "dataDocumento", "descricaoTipoDespesa", "tipoDespesa",
+    "nomeFornecedor", "cnpjCpfFornecedor", "valorDocumento", "valorLiquido", "urlDocumento",
+]
+COLUNAS_VALOR = ["valorDocumento", "valorLiquido", "valorGlosa"]
+COLUNAS_CATEGORIA = ["tipoDespesa", "descricaoTipoDespesa", "nomeFornecedor"]
+
+# Último DataFrame montado por chave, reaproveitado quando as linhas não mudaram
+MONTADOS_MAX_BYTES = int(os.environ.get("CAMARA_MONTADOS_MAX_BYTES", str(32 * 1024 * 1024)))
+cache_memoria.registrar("normalize_despesas", min(1.0, MONTADOS_MAX_BYTES / cache_memoria.ORCAMENTO_BYTES))
+
+
+class _Montado(NamedTuple):
+    digest: bytes
+    truncado: bool
+    df: pd.DataFrame
+
+
+def _digest_linhas(dados: list[dict]) -> bytes:
+    return hashlib.blake2b(pickle.dumps(dados, protocol=pickle.HIGHEST_PROTOCOL), digest_size=16).digest()
+
+
+def normalize_despesas(dados: list[dict], truncado: bool = False, chave: Optional[Hashable] = None) -> pd.DataFrame:
+    """Monta o DataFrame tipado de despesas, ordenado da mais recente para a mais antiga.
+
+    `df.attrs["truncado"]` indica se o limite de páginas cortou o resultado.
+    Com `chave` (ex.: `(dep_id, ano)`), se as linhas tiverem o mesmo
+    conteúdo da montagem anterior dessa chave (só um digest delas fica
+    guardado), devolve o DataFrame anterior em vez de remontar. Os
+    DataFrames guardados contam no orçamento de `cache_memoria`, com até
+    `MONTADOS_MAX_BYTES`.
+    """
+    if chave is None:
+        return _montar(dados, truncado)
+    digest = _digest_linhas(dados)
+    achou, anterior = cache_memoria.obter("normalize_despesas", chave)
+    if achou and anterior.digest == digest and anterior.truncado == truncado:
+        return anterior.df
+    df = _montar(dados, truncado)
+    n = int(df.memory_usage(index=True, deep=True).sum())
+    cache_memoria.guardar("normalize_despesas", chave, _Montado(digest, truncado, df), n)
+    return df
+
+
+def _montar(dados: list[dict], truncado: bool) -> pd.DataFrame:
+    df = pd.DataFrame(dados)
+    for c in COLUNAS_DESPESAS:
+        if c not in df.columns:
+            df[c] = None
+
+    for c in COLUNAS_VALOR:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+    df["dataDocumento"] = pd.to_datetime(df["dataDocumento"], errors="coerce", format="ISO8601")
+    # Sem `mes`/`ano` informados, usa a data do documento
+    df["mes"] = pd.to_numeric(df["mes"], errors="coerce").fillna(df["dataDocumento"].dt.month).astype("Int16")
+    df["ano"] = pd.to_numeric(df["ano"], errors="coerce").fillna(df["dataDocumento"].dt.year).astype("Int16")
+    for c in COLUNAS_CATEGORIA:
+        df[c] = df[c].astype("category")
+
+    df = df.sort_values("dataDocumento", ascending=False, kind="stable", ignore_index=True)
+    df.attrs["truncado"] = truncado
+    return df
+
+
+# Cubo de despesas: totais por estas chaves, mantido a cada busca ou ingestão
+CHAVES_CUBO = ["dep_id", "ano", "mes", "tipoDespesa"]
+COLUNAS_CUBO = CHAVES_CUBO + ["valorLiquido", "valorDocumento", "linhas"]
+
+
+def agrega_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    """Valor líquido, valor do documento e número de linhas por (dep_id, ano, mes, tipoDespesa).
+
+    Aceita despesas (uma linha por documento, com `dep_id`) ou cubos já
+    agregados (com `linhas`), para juntar partes.
+    """
+    if "linhas" not in df.columns:
+        df = df.assign(linhas=1)
+    df = df.assign(
+        dep_id=df["dep_id"].astype("int64"),
+        ano=df["ano"].fillna(0).astype("int64"),
+        mes=df["mes"].fillna(0).astype("int64"),
+        tipoDespesa=df["tipoDespesa"].astype("object").fillna(""),
+    )
+    return (
+        df.groupby(CHAVES_CUBO, sort=True)[["valorLiquido", "valorDocumento", "linhas"]]
+        .sum()
+        .reset_index()
+    )
+
+
+def mensal(cubo: pd.DataFrame) -> pd.Series:
+    """Valor líquido por mês (1 a 12, meses sem despesa com zero) a partir do cubo."""
+    return cubo.groupby("mes")["valorLiquido"].sum().reindex(range(1, 13), fill_value=0.0)
+
+
+def por_categoria(cubo: pd.DataFrame) -> pd.DataFrame:
+    """Totais por tipo de despesa a partir do cubo, maiores primeiro."""
+    return (
+        cubo.groupby("tipoDespesa")[["valorLiquido", "valorDocumento", "linhas"]]
+        .sum()
+        .sort_values("valorLiquido", ascending=False)
+    )
+
+
+def totais_comparados(df: pd.DataFrame, por: str) -> pd.DataFrame:
+    """Valor líquido por `por` (linhas) e deputado (colunas `dep_id`), num único groupby.
+
+    `por` é "ano", "mes" (período AAAA-MM dentro do intervalo) ou
+    "tipoDespesa". `df` é o DataFrame combinado, com a coluna `dep_id`.
+    """
+    chaves = ["ano", "mes"] if por == "mes" else [por]
+    totais = (
+        df.groupby(chaves + ["dep_id"], observed=True)["valorLiquido"].sum()
+        .unstack("dep_id", fill_value=0.0)
+        .sort_index()
+    )
+    if por == "mes":
+        totais.index = [f"{ano}-{mes:02d}" for ano, mes in totais.index]
+    return totais
+
+
+def formata_reais(valor: float) -> str:
+    """R$ no formato brasileiro (ex.: R$ 1.234,56)."""
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
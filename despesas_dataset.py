@@ -0,0 +1,255 @@
+"""Dataset local de despesas a partir dos arquivos anuais em lote da Câmara.
+
+A Câmara publica as despesas da cota parlamentar em arquivos anuais
+(`Ano-AAAA.csv.zip`). `ingest_archive` lê o CSV do zip em blocos, sem
+carregar o arquivo inteiro na memória, e grava um dataset Parquet
+particionado por ano em `DATA_DIR/ano=AAAA/`. As colunas seguem os nomes
+da API, de modo que `read_despesas` devolve o mesmo formato de linhas que
+`get_despesas` monta página a página.
+
+Junto com cada partição, a ingestão grava agregados do ano, acumulados
+bloco a bloco e trocados junto com a partição (`AGREGADOS`): o índice de
+fornecedores (total líquido e documentos por fornecedor × deputado,
+ordenado por CNPJ/CPF; consultado em `fornecedores.py`) e o cubo de
+despesas (`despesas.agrega_cubo`, ordenado por deputado).
+
+Uso:
+    python despesas_dataset.py Ano-2023.csv.zip Ano-2024.csv.zip
+    python despesas_dataset.py --ano 2023 --ano 2024   # baixa do site da Câmara
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from camara_api import get_session
+from despesas import agrega_cubo
+
+DATA_DIR = os.environ.get("CAMARA_DATA_DIR", os.path.join(".cache", "dataset", "despesas"))
+BULK_URL = "https://www.camara.leg.br/cotas/Ano-{ano}.csv.zip"
+CHUNK_ROWS = 50_000
+
+# Coluna do arquivo em lote -> coluna da API
+COLUNAS = {
+    "ideCadastro": "dep_id",
+    "numAno": "ano",
+    "numMes": "mes",
+    "txtDescricao": "tipoDespesa",
+    "ideDocumento": "codDocumento",
+    "indTipoDocumento": "codTipoDocumento",
+    "datEmissao": "dataDocumento",
+    "txtNumero": "numDocumento",
+    "vlrDocumento": "valorDocumento",
+    "urlDocumento": "urlDocumento",
+    "txtFornecedor": "nomeFornecedor",
+    "txtCNPJCPF": "cnpjCpfFornecedor",
+    "vlrLiquido": "valorLiquido",
+    "vlrGlosa": "valorGlosa",
+    "numRessarcimento": "numRessarcimento",
+    "numLote": "codLote",
+    "numParcela": "parcela",
+}
+_INTEIRAS = ["dep_id", "ano", "mes", "codDocumento", "codTipoDocumento", "codLote", "parcela"]
+_VALORES = ["valorDocumento", "valorLiquido", "valorGlosa"]
+
+SCHEMA = pa.schema(
+    [(c, pa.int64()) for c in _INTEIRAS]
+    + [(c, pa.float64()) for c in _VALORES]
+    + [(c, pa.string()) for c in [
+        "tipoDespesa", "dataDocumento", "numDocumento", "urlDocumento",
+        "nomeFornecedor", "cnpjCpfFornecedor", "numRessarcimento",
+    ]]
+)
+
+
+# Chaves do índice de fornecedores; o nome do parlamentar vem junto para exibição
+CHAVES_FORNECEDOR = ["cnpjCpfFornecedor", "nomeFornecedor", "dep_id", "ano"]
+
+
+def _partition_dir(ano: int, data_dir: str) -> str:
+    return os.path.join(data_dir, f"ano={ano}")
+
+
+def agregado_dir(data_dir: str, nome: str) -> str:
+    """Pasta de um agregado (`ano=AAAA.parquet` por ano) de um dataset."""
+    return data_dir.rstrip("/\\") + f"-{nome}"
+
+
+def indice_dir(data_dir: str = DATA_DIR) -> str:
+    """Pasta do índice de fornecedores de um dataset."""
+    return agregado_dir(data_dir, "fornecedores")
+
+
+def agrega_fornecedores(df: pd.DataFrame) -> pd.DataFrame:
+    """Linhas do índice: soma por (fornecedor, deputado, ano), com CNPJ/CPF só em dígitos.
+
+    Aceita tanto despesas normalizadas (com `nomeParlamentar` opcional)
+    quanto agregados anteriores (com `documentos`), para juntar blocos.
+    """
+    df = df.assign(cnpjCpfFornecedor=df["cnpjCpfFornecedor"].fillna("").str.replace(r"\D", "", regex=True))
+    if "documentos" not in df.columns:
+        df = df.assign(documentos=1)
+    if "nomeParlamentar" not in df.columns:
+        df = df.assign(nomeParlamentar=None)
+    return (
+        df.groupby(CHAVES_FORNECEDOR, dropna=False, sort=False)
+        .agg(nomeParlamentar=("nomeParlamentar", "first"), valorLiquido=("valorLiquido", "sum"), documentos=("documentos", "sum"))
+        .reset_index()
+    )
+
+
+# Agregados gravados por ano na ingestão: nome -> (função de agregação, coluna de ordenação)
+AGREGADOS = {
+    "fornecedores": (agrega_fornecedores, "cnpjCpfFornecedor"),
+    "cubo": (agrega_cubo, "dep_id"),
+}
+
+
+def _grava_agregado(nome: str, agregado: pd.DataFrame, destino: str) -> None:
+    _, ordem = AGREGADOS[nome]
+    agregado.sort_values(ordem, kind="stable", ignore_index=True).to_parquet(destino, index=False)
+
+
+def _normalize_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    df = chunk.reindex(columns=list(COLUNAS)).rename(columns=COLUNAS)
+    # Linhas sem ideCadastro são despesas de lideranças, não de deputados
+    df = df[df["dep_id"].notna()].copy()
+    for c in _INTEIRAS:
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64")
+    for c in _VALORES:
+        # astype("string"): colunas ausentes no arquivo chegam do reindex como float NaN
+        df[c] = pd.to_numeric(df[c].astype("string").str.replace(",", ".", regex=False), errors="coerce")
+    return df[SCHEMA.names]
+
+
+def ingest_archive(path: str, data_dir: str = DATA_DIR, chunk_rows: int = CHUNK_ROWS) -> dict[int, int]:
+    """Ingere um `Ano-AAAA.csv.zip` no dataset; devolve linhas gravadas por ano.
+
+    As partições dos anos presentes no arquivo são substituídas por inteiro
+    (a troca só acontece ao final, então uma ingestão interrompida não
+    deixa partição pela metade).
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    tmp_root = tempfile.mkdtemp(prefix=".ingest-", dir=data_dir)
+    writers: dict[int, pq.ParquetWriter] = {}
+    linhas: dict[int, int] = {}
+    # Agregado acumulado por (agregado, ano), atualizado a cada bloco
+    acumulados: dict[tuple[str, int], pd.DataFrame] = {}
+    try:
+        with zipfile.ZipFile(path) as zf:
+            membro = next(n for n in zf.namelist() if n.lower().endswith(".csv"))
+            with zf.open(membro) as f:
+                leitor = pd.read_csv(
+                    f, sep=";", dtype=str, encoding="utf-8-sig", chunksize=chunk_rows
+                )
+                for chunk in leitor:
+                    df = _normalize_chunk(chunk)
+                    nomes = chunk["txNomeParlamentar"] if "txNomeParlamentar" in chunk.columns else None
+                    for ano, parte in df.groupby("ano"):
+                        ano = int(ano)
+                        if ano not in writers:
+                            os.makedirs(os.path.join(tmp_root, f"ano={ano}"))
+                            writers[ano] = pq.ParquetWriter(
+                                os.path.join(tmp_root, f"ano={ano}", "part-0.parquet"), SCHEMA
+                            )
+                        writers[ano].write_table(pa.Table.from_pandas(parte, schema=SCHEMA, preserve_index=False))
+                        linhas[ano] = linhas.get(ano, 0) + len(parte)
+                        parte = parte.assign(nomeParlamentar=nomes.loc[parte.index] if nomes is not None else None)
+                        for nome, (agrega, _) in AGREGADOS.items():
+                            # Junta ao acumulado já: a memória fica no tamanho do agregado, não do arquivo
+                            anterior = acumulados.get((nome, ano))
+                            parcial = agrega(parte)
+                            acumulados[(nome, ano)] = (
+                                parcial if anterior is None else agrega(pd.concat([anterior, parcial], ignore_index=True))
+                            )
+        for w in writers.values():
+            w.close()
+        writers.clear()
+        for (nome, ano), agregado in acumulados.items():
+            _grava_agregado(nome, agregado, os.path.join(tmp_root, f"{nome}-{ano}.parquet"))
+        for nome in AGREGADOS:
+            os.makedirs(agregado_dir(data_dir, nome), exist_ok=True)
+        for ano in linhas:
+            destino = _partition_dir(ano, data_dir)
+            antigo = destino + ".old"
+            if os.path.exists(destino):
+                os.replace(destino, antigo)
+            os.replace(os.path.join(tmp_root, f"ano={ano}"), destino)
+            shutil.rmtree(antigo, ignore_errors=True)
+            for nome in AGREGADOS:
+                os.replace(
+                    os.path.join(tmp_root, f"{nome}-{ano}.parquet"),
+                    os.path.join(agregado_dir(data_dir, nome), f"ano={ano}.parquet"),
+                )
+    finally:
+        for w in writers.values():
+            w.close()
+        shutil.rmtree(tmp_root, ignore_errors=True)
+    return linhas
+
+
+def download_archive(ano: int, dest_dir: str) -> str:
+    """Baixa o arquivo em lote do ano (em streaming) e devolve o caminho local."""
+    destino = os.path.join(dest_dir, f"Ano-{ano}.csv.zip")
+    with get_session().get(BULK_URL.format(ano=ano), stream=True, timeout=300) as r:
+        r.raise_for_status()
+        with open(destino, "wb") as f:
+            for bloco in r.iter_content(chunk_size=1 << 20):
+                f.write(bloco)
+    return destino
+
+
+def partition_age(ano: int, data_dir: str = DATA_DIR) -> Optional[float]:
+    """Segundos desde a ingestão do ano, ou None se o ano não está no dataset."""
+    arquivo = os.path.join(_partition_dir(ano, data_dir), "part-0.parquet")
+    if not os.path.exists(arquivo):
+        return None
+    return time.time() - os.path.getmtime(arquivo)
+
+
+def read_despesas(dep_id: int, ano: int, data_dir: str = DATA_DIR) -> Optional[list[dict]]:
+    """Linhas do deputado no ano, no formato da API; None se o ano não está no dataset."""
+    if partition_age(ano, data_dir) is None:
+        return None
+    df = pd.read_parquet(
+        os.path.join(_partition_dir(ano, data_dir), "part-0.parquet"), filters=[("dep_id", "==", dep_id)]
+    )
+    df = df.drop(columns="dep_id").sort_values("dataDocumento", ascending=False)
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def read_cubo(dep_id: int, ano: int, data_dir: str = DATA_DIR) -> Optional[pd.DataFrame]:
+    """Cubo do deputado no ano, gravado na ingestão; None se o ano não tem cubo no dataset."""
+    arquivo = os.path.join(agregado_dir(data_dir, "cubo"), f"ano={ano}.parquet")
+    if partition_age(ano, data_dir) is None or not os.path.exists(arquivo):
+        return None
+    return pd.read_parquet(arquivo, filters=[("dep_id", "==", dep_id)])
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingere arquivos anuais de despesas da Câmara no dataset local.")
+    parser.add_argument("arquivos", nargs="*", help="arquivos Ano-AAAA.csv.zip já baixados")
+    parser.add_argument("--ano", type=int, action="append", default=[], help="baixa e ingere o ano do site da Câmara")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args(argv)
+    if not args.arquivos and not args.ano:
+        parser.error("informe arquivos ou --ano")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivos = list(args.arquivos) + [download_archive(ano, tmp) for ano in args.ano]
+        for arquivo in arquivos:
+            inicio = time.perf_counter()
+            linhas = ingest_archive(arquivo, args.data_dir)
+            resumo = ", ".join(f"{ano}: {n} linhas" for ano, n in sorted(linhas.items()))
+            print(f"{arquivo} -> {resumo or 'nenhuma linha'} ({time.perf_counter() - inicio:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""Armazenamento local e persistente das despesas por (deputado, ano).
+
+As linhas vindas da API ficam num SQLite em `CAMARA_CACHE_DIR`, que
+sobrevive a restarts e redeploys. O ano corrente (e o anterior, durante a
+carência em que as notas de dezembro ainda entram) é renovado a cada
+`REFRESH_SECONDS`. Anos fechados são buscados uma última vez depois do
+fechamento e então nunca mais (`dados_valem`).
+
+Quando o ano foi ingerido no dataset em lote (`despesas_dataset`), ele tem
+prioridade sobre o SQLite e a API.
+
+Cada gravação guarda também o cubo do ano (`despesas.agrega_cubo`: totais
+por mês e tipo de despesa), na mesma transação, para que totais e gráficos
+não precisem reler e agregar as linhas.
+
+Ao renovar um ano aberto que já está salvo, só as páginas mais recentes
+são buscadas (a API ordena por `dataDocumento`, da mais nova para a mais
+antiga), até aparecerem documentos já conhecidos; o resto vem das linhas
+salvas (`_sincronizar`). Como notas lançadas com atraso podem ter data
+antiga, a cada `SINCRONIA_COMPLETA` segundos o ano é buscado inteiro.
+"""
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Generator, Iterator, Optional
+
+import pandas as pd
+
+import despesas_dataset
+import metricas
+from camara_api import fetch_despesas, fetch_despesas_recentes, iter_despesas
+from despesas import COLUNAS_CUBO, agrega_cubo, normalize_despesas
+from singleflight import SingleFlight
+
+CACHE_DIR = os.environ.get("CAMARA_CACHE_DIR", ".cache")
+DB_PATH = os.path.join(CACHE_DIR, "despesas.sqlite3")
+REFRESH_SECONDS = int(os.environ.get("CAMARA_REFRESH_SECONDS", "600"))
+# Partição do ano corrente no dataset vale por um dia (os arquivos em lote são diários)
+DATASET_MAX_AGE = int(os.environ.get("CAMARA_DATASET_MAX_AGE", str(24 * 3600)))
+CARENCIA_MESES = 3
+# Intervalo máximo entre buscas completas de um ano aberto (entre elas, só as páginas novas)
+SINCRONIA_COMPLETA = int(os.environ.get("CAMARA_SINCRONIA_COMPLETA", str(6 * 3600)))
+
+# Sessões pedindo o mesmo (deputado, ano) ao mesmo tempo dividem uma única busca
+_buscas = SingleFlight()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS despesas (
+    dep_id INTEGER NOT NULL,
+    ano INTEGER NOT NULL,
+    buscado_em REAL NOT NULL,
+    truncado INTEGER NOT NULL,
+    dados BLOB NOT NULL,
+    PRIMARY KEY (dep_id, ano)
+);
+CREATE TABLE IF NOT EXISTS cubos (
+    dep_id INTEGER NOT NULL,
+    ano INTEGER NOT NULL,
+    buscado_em REAL NOT NULL,
+    dados TEXT NOT NULL,
+    PRIMARY KEY (dep_id, ano)
+);
+CREATE TABLE IF NOT EXISTS sincronias (
+    dep_id INTEGER NOT NULL,
+    ano INTEGER NOT NULL,
+    completa_em REAL NOT NULL,
+    PRIMARY KEY (dep_id, ano)
+)
+"""
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    con = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        con.execute("PRAGMA journal_mode=WAL")
+        con.executescript(_SCHEMA)
+        with con:
+            yield con
+    finally:
+        con.close()
+
+
+def ano_fechado(ano: int, hoje: Optional[date] = None) -> bool:
+    """Um ano está fechado quando já passou a carência do ano seguinte."""
+    hoje = hoje or date.today()
+    return ano < hoje.year - 1 or (ano == hoje.year - 1 and hoje.month > CARENCIA_MESES)
+
+
+def fechamento(ano: int) -> float:
+    """Instante (hora local) em que o ano fecha: o fim da carência do ano seguinte."""
+    return datetime(ano + 1 + CARENCIA_MESES // 12, CARENCIA_MESES % 12 + 1, 1).timestamp()
+
+
+def dados_valem(ano: int, obtidos_em: float, validade: float) -> bool:
+    """Se dados do ano obtidos em `obtidos_em` ainda valem.
+
+    Só o que foi obtido depois do fechamento do ano é definitivo; um
+    retrato tirado com o ano aberto segue a `validade` (em segundos), mesmo
+    que o ano já tenha fechado, e é buscado de novo ao vencer.
+    """
+    return obtidos_em >= fechamento(ano) or time.time() - obtidos_em <= validade
+
+
+def load(dep_id: int, ano: int) -> Optional[tuple[list[dict], bool]]:
+    """Devolve `(dados, truncado)` salvos, ou None se ausentes ou vencidos."""
+    with _connect() as con:
+        row = con.execute(
+            "SELECT buscado_em, truncado, dados FROM despesas WHERE dep_id = ? AND ano = ?", (dep_id, ano)
+        ).fetchone()
+    if row is None:
+        return None
+    buscado_em, truncado, dados = row
+    if not dados_valem(ano, buscado_em, REFRESH_SECONDS):
+        return None
+    return json.loads(zlib.decompress(dados)), bool(truncado)
+
+
+def save(dep_id: int, ano: int, dados: list[dict], truncado: bool, completa: bool = True) -> None:
+    """Grava as linhas e o cubo do ano; `completa=False` para o resultado de uma sincronização parcial."""
+    blob = zlib.compress(json.dumps(dados, ensure_ascii=False).encode("utf-8"))
+    cubo = agrega_cubo(normalize_despesas(dados, truncado).assign(dep_id=dep_id))
+    agora = time.time()
+    with _connect() as con:
+        con.execute(
+            "INSERT OR REPLACE INTO despesas (dep_id, ano, buscado_em, truncado, dados) VALUES (?, ?, ?, ?, ?)",
+            (dep_id, ano, agora, int(truncado), blob),
+        )
+        con.execute(
+            "INSERT OR REPLACE INTO cubos (dep_id, ano, buscado_em, dados) VALUES (?, ?, ?, ?)",
+            (dep_id, ano, agora, cubo.to_json(orient="values")),
+        )
+        if completa:
+            con.execute(
+                "INSERT OR REPLACE INTO sincronias (dep_id, ano, completa_em) VALUES (?, ?, ?)", (dep_id, ano, agora)
+            )
+
+
+def _dataset_vale(ano: int) -> bool:
+    # Partição ingerida com o ano aberto vence como as do ano corrente, mesmo depois do fechamento
+    idade = despesas_dataset.partition_age(ano)
+    return idade is not None and dados_valem(ano, time.time() - idade, DATASET_MAX_AGE)
+
+
+def has_local(dep_id: int, ano: Optional[int]) -> bool:
+    """Indica, sem carregar as linhas, se o ano pode ser servido localmente."""
+    if ano is None:
+        return False
+    if _dataset_vale(ano):
+        return True
+    try:
+        with _connect() as con:
+            row = con.execute(
+                "SELECT buscado_em FROM despesas WHERE dep_id = ? AND ano = ?", (dep_id, ano)
+            ).fetchone()
+    except (OSError, sqlite3.Error):
+        return False
+    return row is not None and dados_valem(ano, row[0], REFRESH_SECONDS)
+
+
+def load_local(dep_id: int, ano: int) -> Optional[tuple[list[dict], bool]]:
+    """`(dados, truncado)` do dataset em lote ou do SQLite; None se precisa ir à API."""
+    if _dataset_vale(ano):
+        return despesas_dataset.read_despesas(dep_id, ano), False
+    # Falhas de disco (cheio, somente leitura) não impedem a consulta: só não persistem
+    try:
+        return load(dep_id, ano)
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def _cubo_salvo(dep_id: int, ano: int) -> Optional[pd.DataFrame]:
+    with _connect() as con:
+        row = con.execute(
+            "SELECT buscado_em, dados FROM cubos WHERE dep_id = ? AND ano = ?", (dep_id, ano)
+        ).fetchone()
+    if row is None or not dados_valem(ano, row[0], REFRESH_SECONDS):
+        return None
+    return agrega_cubo(pd.DataFrame(json.loads(row[1]), columns=COLUNAS_CUBO))
+
+
+def load_cubo(dep_id: int, ano: int) -> Optional[pd.DataFrame]:
+    """Cubo do ano, do dataset em lote ou do SQLite; None se ausente ou vencido."""
+    if _dataset_vale(ano):
+        cubo = despesas_dataset.read_cubo(dep_id, ano)
+        # Datasets ingeridos antes do cubo existir não o têm; o chamador agrega as linhas
+        return agrega_cubo(cubo) if cubo is not None else None
+    try:
+        return _cubo_salvo(dep_id, ano)
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def _save_quietly(dep_id: int, ano: int, dados: list[dict], truncado: bool, completa: bool = True) -> None:
+    try:
+        save(dep_id, ano, dados, truncado, completa)
+    except (OSError, sqlite3.Error):
+        pass
+
+
+def _chave_documento(d: dict) -> tuple:
+    # codDocumento vem 0 em alguns lançamentos; os demais campos desempatam
+    return (
+        d.get("codDocumento"), d.get("numDocumento"), d.get("dataDocumento"),
+        d.get("valorDocumento"), d.get("valorLiquido"), d.get("parcela"), d.get("cnpjCpfFornecedor"),
+    )
+
+
+def _sincronizavel(dep_id: int, ano: int) -> bool:
+    """Se o ano tem linhas salvas que podem ser renovadas só pelas páginas novas.
+
+    Não podem quando o ano está fechado, nunca foi salvo, veio truncado ou
+    a última busca completa foi há mais de `SINCRONIA_COMPLETA`.
+    """
+    if ano_fechado(ano) or SINCRONIA_COMPLETA <= 0:
+        return False
+    try:
+        with _connect() as con:
+            row = con.execute(
+                "SELECT d.truncado, s.completa_em FROM despesas d "
+                "JOIN sincronias s ON s.dep_id = d.dep_id AND s.ano = d.ano WHERE d.dep_id = ? AND d.ano = ?",
+                (dep_id, ano),
+            ).fetchone()
+    except (OSError, sqlite3.Error):
+        return False
+    return row is not None and not row[0] and time.time() - row[1] <= SINCRONIA_COMPLETA
+
+
+def _anteriores(dep_id: int, ano: int) -> Optional[list[dict]]:
+    """Linhas salvas (mesmo vencidas) do ano, se ele for `_sincronizavel`."""
+    if not _sincronizavel(dep_id, ano):
+        return None
+    try:
+        with _connect() as con:
+            row = con.execute("SELECT dados FROM despesas WHERE dep_id = ? AND ano = ?", (dep_id, ano)).fetchone()
+    except (OSError, sqlite3.Error):
+        return None
+    return json.loads(zlib.decompress(row[0])) if row is not None else None
+
+
+def _sincronizar(dep_id: int, ano: int, anteriores: list[dict]) -> Optional[tuple[list[dict], bool]]:
+    """Busca só as páginas novas e junta com `anteriores`; None se é preciso buscar tudo.
+
+    Devolve `(dados, completa)`; `completa` quando as páginas acabaram antes
+    de chegar a um documento conhecido, e os dados são o resultado inteiro.
+    """
+    conhecidos = {_chave_documento(d) for d in anteriores}
+    novos, parada = fetch_despesas_recentes(dep_id, ano, lambda d: _chave_documento(d) in conhecidos)
+    if parada == "limite":
+        return None
+    if parada == "fim":
+        return novos, True
+    # As páginas lidas cobrem tudo a partir da data mais antiga que trouxeram; das salvas, ficam
+    # as anteriores a ela (e as da própria data que não vieram, que podem estar na página seguinte)
+    lidos = {_chave_documento(d) for d in novos}
+    corte = min((d.get("dataDocumento") or "" for d in novos), default="")
+    return novos + [
+        d for d in anteriores if (d.get("dataDocumento") or "") <= corte and _chave_documento(d) not in lidos
+    ], False
+
+
+def _buscar_e_salvar(dep_id: int, ano: int) -> tuple[list[dict], bool]:
+    # Outra sessão pode ter acabado de salvar enquanto esta esperava a vez
+    salvo = load_local(dep_id, ano)
+    if salvo is not None:
+        return salvo
+    anteriores = _anteriores(dep_id, ano)
+    if anteriores is not None:
+        sincronia = _sincronizar(dep_id, ano, anteriores)
+        if sincronia is not None:
+            dados, completa = sincronia
+            if metricas.ATIVO:
+                metricas.incrementar("camara_sincronias_total", tipo="completa" if completa else "parcial")
+            _save_quietly(dep_id, ano, dados, False, completa=completa)
+            return dados, False
+    if metricas.ATIVO:
+        metricas.incrementar("camara_sincronias_total", tipo="completa")
+    dados, truncado = fetch_despesas(dep_id, ano)
+    _save_quietly(dep_id, ano, dados, truncado)
+    return dados, truncado
+
+
+def load_or_fetch(dep_id: int, ano: Optional[int] = None) -> tuple[list[dict], bool]:
+    """Despesas do armazenamento local, buscando na API (e salvando) quando preciso."""
+    if ano is None:
+        return _buscas.executar((dep_id, None), lambda: fetch_despesas(dep_id))
+    salvo = load_local(dep_id, ano)
+    if salvo is not None:
+        return salvo
+    return _buscas.executar((dep_id, ano), lambda: _buscar_e_salvar(dep_id, ano))
+
+
+def iter_load_or_fetch(
+    dep_id: int, ano: Optional[int] = None
+) -> Generator[tuple[int, Optional[int], list[dict]], None, tuple[list[dict], bool]]:
+    """Versão em fluxo de `load_or_fetch`: produz `(página, total, linhas)`.
+
+    Dados locais saem de uma vez, como página única. O valor de retorno é
+    o mesmo `(dados, truncado)` de `load_or_fetch`.
+    """
+    salvo = load_local(dep_id, ano) if ano is not None else None
+    if salvo is None and ano is not None and _sincronizavel(dep_id, ano):
+        # Renovação parcial: uma ou duas páginas, não vale o fluxo
+        salvo = load_or_fetch(dep_id, ano)
+    if salvo is not None:
+        yield 1, 1, salvo[0]
+        return salvo
+    dados: list[dict] = []
+    paginas = iter_despesas(dep_id, ano)
+    while True:
+        try:
+            pagina = next(paginas)
+        except StopIteration as fim:
+            truncado = fim.value
+            break
+        dados.extend(pagina[2])
+        yield pagina
+    if ano is not None:
+        _save_quietly(dep_id, ano, dados, truncado)
+    return dados, truncado
@@ -0,0 +1,49 @@
+"""Exportação das tabelas dos apps (CSV, Parquet e ZIP com vários anos).
+
+Nada aqui roda a cada rerun: os apps passam para `st.download_button`
+uma função que só é chamada quando o usuário clica, e guardam o
+resultado em cache por conjunto de dados.
+"""
+import io
+import zipfile
+from typing import Callable, Iterable
+
+import pandas as pd
+
+# Linhas serializadas por vez ao escrever CSV dentro do ZIP
+CHUNK_LINHAS = 20_000
+
+
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def parquet_bytes(df: pd.DataFrame) -> bytes:
+    """Parquet (pyarrow) com os tipos do DataFrame: datas, inteiros e categóricas."""
+    buf = io.BytesIO()
+    df.to_parquet(buf, index=False)
+    return buf.getvalue()
+
+
+def _escrever_csv(zf: zipfile.ZipFile, nome: str, df: pd.DataFrame) -> None:
+    """Escreve `df` como CSV dentro do ZIP em blocos, sem montar o arquivo inteiro na memória."""
+    with zf.open(nome, "w", force_zip64=True) as bruto, io.TextIOWrapper(bruto, encoding="utf-8", newline="") as texto:
+        for inicio in range(0, max(len(df), 1), CHUNK_LINHAS):
+            df.iloc[inicio:inicio + CHUNK_LINHAS].to_csv(texto, index=False, header=inicio == 0)
+
+
+def zip_despesas(dep_id: int, anos: Iterable[int], carregar: Callable[[int, int], pd.DataFrame]) -> bytes:
+    """ZIP com um CSV por ano (`despesas_<dep_id>_<ano>.csv`).
+
+    Os anos são carregados com `carregar(dep_id, ano)` e escritos um de
+    cada vez, então só um ano fica em memória como DataFrame (o ZIP
+    comprimido, sim, inteiro: o `st.download_button` guarda os bytes de
+    qualquer forma). Anos sem despesas ficam de fora.
+    """
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for ano in anos:
+            df = carregar(dep_id, ano)
+            if not df.empty:
+                _escrever_csv(zf, f"despesas_{dep_id}_{ano}.csv", df)
+    return buf.getvalue()
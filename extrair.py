@@ -0,0 +1,200 @@
+"""Extração em lote das despesas, sem Streamlit (para jobs agendados).
+
+Busca as despesas de uma lista de deputados (ou de todos os em exercício)
+em um intervalo de anos, com um pool de workers e o limite de requisições
+por segundo do processo (`camara_api.configure_rate_limit`), e grava um
+arquivo por (deputado, ano) em `<saida>/ano=AAAA/dep_id=N.parquet` (ou
+`.csv`). As colunas `ano` e `dep_id` vão dentro dos arquivos; para ler
+tudo de uma vez: `pd.read_parquet(saida, partitioning=None)`.
+
+Cada par concluído entra no checkpoint (`<saida>/_checkpoint.jsonl`);
+rodar de novo com a mesma saída continua de onde parou. Pares extraídos
+com o ano ainda aberto só são pulados durante `--validade-aberto`
+horas. Ao final sai o resumo de vazão (linhas/s e requisições/s).
+
+Uso:
+    python extrair.py 204554 160976 --ano-ini 2019 --ano-fim 2024
+    python extrair.py --todos --formato csv --workers 8 --taxa 5 --saida extracao
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Optional
+
+import requests
+
+import despesas_store
+from camara_api import (
+    POOL_SIZE, RATE_BURST, RATE_LIMIT, configure_rate_limit, configure_session, fetch_despesas, get_session,
+)
+from despesas import normalize_despesas
+from roster import get_roster
+
+SAIDA = "extracao"
+CHECKPOINT = "_checkpoint.jsonl"
+WORKERS = int(os.environ.get("CAMARA_EXTRAIR_WORKERS", "8"))
+# Anos abertos extraídos há menos que isto não são refeitos ao retomar
+VALIDADE_ABERTO_HORAS = 12.0
+
+
+def _arquivo(saida: str, dep_id: int, ano: int, formato: str) -> str:
+    return os.path.join(saida, f"ano={ano}", f"dep_id={dep_id}.{formato}")
+
+
+def ler_checkpoint(saida: str, validade_aberto: float = VALIDADE_ABERTO_HORAS * 3600) -> set[tuple[int, int]]:
+    """Pares (deputado, ano) já extraídos e ainda válidos."""
+    feitos = set()
+    try:
+        with open(os.path.join(saida, CHECKPOINT), encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    item = json.loads(linha)
+                except ValueError:
+                    continue  # última linha cortada por uma interrupção
+                # Ano extraído ainda aberto vence como um ano aberto, mesmo depois de fechar
+                if despesas_store.dados_valem(item["ano"], item["em"], validade_aberto):
+                    feitos.add((item["dep_id"], item["ano"]))
+    except FileNotFoundError:
+        pass
+    return feitos
+
+
+class Checkpoint:
+    """Registro (append-only) dos pares concluídos, uma linha JSON por par."""
+
+    def __init__(self, saida: str):
+        self._f = open(os.path.join(saida, CHECKPOINT), "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def marcar(self, dep_id: int, ano: int, linhas: int, truncado: bool) -> None:
+        item = {"dep_id": dep_id, "ano": ano, "linhas": linhas, "truncado": truncado, "em": time.time()}
+        with self._lock:
+            self._f.write(json.dumps(item) + "\n")
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def extrair_par(dep_id: int, ano: int, saida: str, formato: str, direto: bool = False) -> tuple[int, bool]:
+    """Busca e grava as despesas de um (deputado, ano); devolve `(linhas, truncado)`.
+
+    Por padrão passa pelo armazenamento local (dataset em lote e SQLite),
+    que também fica atualizado para os apps; `direto` vai sempre à API.
+    """
+    if direto:
+        dados, truncado = fetch_despesas(dep_id, ano)
+    else:
+        dados, truncado = despesas_store.load_or_fetch(dep_id, ano)
+    if not dados:
+        return 0, truncado
+    df = normalize_despesas(dados, truncado).assign(dep_id=dep_id)
+    destino = _arquivo(saida, dep_id, ano, formato)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = f"{destino}.{threading.get_ident()}.tmp"
+    if formato == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False)
+    os.replace(tmp, destino)
+    return len(df), truncado
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    ano_atual = datetime.now().year
+    parser = argparse.ArgumentParser(description="Extrai em lote as despesas de deputados da Câmara.")
+    parser.add_argument("ids", nargs="*", type=int, help="IDs dos deputados")
+    parser.add_argument("--todos", action="store_true", help="todos os deputados em exercício")
+    parser.add_argument("--ano-ini", type=int, default=2015)
+    parser.add_argument("--ano-fim", type=int, default=ano_atual)
+    parser.add_argument("--formato", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--saida", default=SAIDA)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="pares (deputado, ano) buscados ao mesmo tempo")
+    parser.add_argument("--taxa", type=float, default=RATE_LIMIT, help="requisições por segundo (0 = sem limite)")
+    parser.add_argument("--direto", action="store_true", help="ignora o armazenamento local e busca tudo na API")
+    parser.add_argument("--recomecar", action="store_true", help="descarta o checkpoint e extrai tudo de novo")
+    parser.add_argument("--validade-aberto", type=float, default=VALIDADE_ABERTO_HORAS, metavar="HORAS")
+    parser.add_argument("--relatorio", help="grava o resumo em JSON neste arquivo")
+    args = parser.parse_args(argv)
+    if not args.ids and not args.todos:
+        parser.error("informe IDs de deputados ou --todos")
+
+    configure_rate_limit(args.taxa, max(RATE_BURST, args.workers))
+    configure_session(max(POOL_SIZE, args.workers))
+    requisicoes = 0
+    contagem_lock = threading.Lock()
+
+    def contar(r: requests.Response, *_, **__) -> None:
+        nonlocal requisicoes
+        with contagem_lock:
+            requisicoes += 1
+
+    get_session().hooks["response"].append(contar)
+
+    inicio = time.perf_counter()
+    dep_ids = list(dict.fromkeys(args.ids + ([d["id"] for d in get_roster().deputados] if args.todos else [])))
+    os.makedirs(args.saida, exist_ok=True)
+    if args.recomecar and os.path.exists(os.path.join(args.saida, CHECKPOINT)):
+        os.remove(os.path.join(args.saida, CHECKPOINT))
+    feitos = ler_checkpoint(args.saida, args.validade_aberto * 3600)
+    pares = [(d, a) for d in dep_ids for a in range(args.ano_ini, args.ano_fim + 1) if (d, a) not in feitos]
+    print(f"{len(pares)} pares a extrair ({len(feitos)} já no checkpoint), {args.workers} workers", file=sys.stderr)
+
+    checkpoint = Checkpoint(args.saida)
+    linhas, truncados, falhas = 0, [], []
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as ex:
+            futuros = {ex.submit(extrair_par, d, a, args.saida, args.formato, args.direto): (d, a) for d, a in pares}
+            try:
+                for i, fut in enumerate(as_completed(futuros), 1):
+                    dep_id, ano = futuros[fut]
+                    try:
+                        n, truncado = fut.result()
+                    except Exception as e:
+                        # Qualquer erro de um par (rede, disco, dados inesperados) vira falha e o lote segue
+                        falhas.append((dep_id, ano))
+                        print(f"[{i}/{len(pares)}] {dep_id} {ano}: falhou ({e!r})", file=sys.stderr)
+                        continue
+                    checkpoint.marcar(dep_id, ano, n, truncado)
+                    linhas += n
+                    if truncado:
+                        truncados.append((dep_id, ano))
+                    print(f"[{i}/{len(pares)}] {dep_id} {ano}: {n} linhas", file=sys.stderr)
+            except BaseException:
+                # Ctrl+C (ou erro no próprio laço): espera só os pares em andamento, não a fila
+                ex.shutdown(cancel_futures=True)
+                raise
+    finally:
+        checkpoint.close()
+
+    segundos = time.perf_counter() - inicio
+    resumo = {
+        "pares": len(pares) - len(falhas),
+        "falhas": falhas,
+        "truncados": truncados,
+        "linhas": linhas,
+        "requisicoes": requisicoes,
+        "segundos": round(segundos, 2),
+        "linhas_por_s": round(linhas / segundos, 1) if segundos else 0.0,
+        "requisicoes_por_s": round(requisicoes / segundos, 2) if segundos else 0.0,
+    }
+    print(
+        f"{resumo['pares']} pares, {linhas} linhas, {requisicoes} requisições em {segundos:.1f}s "
+        f"({resumo['linhas_por_s']} linhas/s, {resumo['requisicoes_por_s']} req/s)"
+    )
+    if falhas:
+        print(f"{len(falhas)} pares falharam; rode de novo para tentar só esses.")
+    if args.relatorio:
+        with open(args.relatorio, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, indent=2)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
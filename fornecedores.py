@@ -0,0 +1,158 @@
+"""Consulta de fornecedores: quais deputados pagaram um fornecedor, e quanto por ano.
+
+Usa o índice que `despesas_dataset` grava a cada ingestão (um arquivo por
+ano, com total líquido e documentos por fornecedor × deputado), então a
+resposta vem do disco local em vez de varrer a API deputado a deputado.
+O índice fica em memória no processo (descontado do orçamento de
+`cache_memoria`) e é recarregado quando algum ano é reingerido.
+
+Para datasets ingeridos antes do índice existir:
+    python fornecedores.py --reconstruir
+"""
+import argparse
+import glob
+import os
+import re
+import threading
+from typing import Optional
+
+import pandas as pd
+
+import cache_memoria
+import despesas_dataset
+from despesas_dataset import DATA_DIR, agrega_fornecedores, indice_dir
+from roster import normalize_nome
+
+# Busca só por dígitos (com ao menos isto) é tratada como CNPJ/CPF
+MIN_DIGITOS = 4
+
+
+class FornecedorIndex:
+    """Índice invertido fornecedor -> (deputado, ano, valor), em memória."""
+
+    def __init__(self, df: pd.DataFrame, versao: tuple = ()):
+        self.df = df.assign(nomeFornecedor=df["nomeFornecedor"].astype("category"))
+        self.versao = versao
+        categorias = self.df["nomeFornecedor"].cat.categories
+        self._nomes = pd.Series([normalize_nome(str(c)) for c in categorias], dtype="string")
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def bytes(self) -> int:
+        """Memória ocupada pelo índice."""
+        return cache_memoria.tamanho(self.df) + cache_memoria.tamanho(self._nomes)
+
+    def buscar(self, texto: str) -> pd.DataFrame:
+        """Linhas do fornecedor: por prefixo do CNPJ/CPF ou por trecho do nome (sem acentos)."""
+        digitos = re.sub(r"\D", "", texto)
+        if len(digitos) >= MIN_DIGITOS and not re.search(r"[^\d\s./-]", texto):
+            return self.df[self.df["cnpjCpfFornecedor"].str.startswith(digitos)]
+        alvo = normalize_nome(texto)
+        if not alvo:
+            return self.df.iloc[0:0]
+        codigos = self._nomes.index[self._nomes.str.contains(alvo, regex=False)]
+        return self.df[self.df["nomeFornecedor"].cat.codes.isin(codigos)]
+
+
+def _arquivos(data_dir: str) -> list[str]:
+    return sorted(glob.glob(os.path.join(indice_dir(data_dir), "ano=*.parquet")))
+
+
+def _versao(data_dir: str) -> tuple:
+    return tuple((a, os.path.getmtime(a)) for a in _arquivos(data_dir))
+
+
+def carregar_indice(data_dir: str = DATA_DIR) -> FornecedorIndex:
+    versao = _versao(data_dir)
+    partes = [pd.read_parquet(a) for a, _ in versao]
+    if not partes:
+        colunas = despesas_dataset.CHAVES_FORNECEDOR + ["nomeParlamentar", "valorLiquido", "documentos"]
+        return FornecedorIndex(pd.DataFrame(columns=colunas), versao)
+    return FornecedorIndex(pd.concat(partes, ignore_index=True), versao)
+
+
+_indices: dict[str, FornecedorIndex] = {}
+_indices_lock = threading.Lock()
+cache_memoria.registrar("indice_fornecedores")
+
+
+def get_indice(data_dir: str = DATA_DIR) -> FornecedorIndex:
+    """Índice compartilhado do processo, recarregado quando os arquivos mudam."""
+    with _indices_lock:
+        atual = _indices.get(data_dir)
+        if atual is None or atual.versao != _versao(data_dir):
+            atual = _indices[data_dir] = carregar_indice(data_dir)
+            cache_memoria.reservar("indice_fornecedores", data_dir, atual.bytes())
+        return atual
+
+
+def totais_por_deputado(linhas: pd.DataFrame) -> pd.DataFrame:
+    """Total líquido por deputado (linhas) e ano (colunas), com o total geral, maiores primeiro."""
+    tabela = linhas.pivot_table(
+        index="dep_id", columns="ano", values="valorLiquido", aggfunc="sum", fill_value=0.0, observed=True
+    )
+    tabela.columns = [str(ano) for ano in tabela.columns]
+    tabela["Total"] = tabela.sum(axis=1)
+    return tabela.sort_values("Total", ascending=False)
+
+
+def fornecedores_encontrados(linhas: pd.DataFrame) -> pd.DataFrame:
+    """Fornecedores distintos do resultado, com total e documentos."""
+    return (
+        linhas.groupby(["cnpjCpfFornecedor", "nomeFornecedor"], observed=True)
+        .agg(valorLiquido=("valorLiquido", "sum"), documentos=("documentos", "sum"))
+        .sort_values("valorLiquido", ascending=False)
+        .reset_index()
+    )
+
+
+def reconstruir(data_dir: str = DATA_DIR, anos: Optional[list[int]] = None) -> dict[int, int]:
+    """Refaz o índice a partir das partições já ingeridas; devolve linhas do índice por ano.
+
+    Partições antigas não guardam o nome do parlamentar, então essas linhas
+    ficam sem `nomeParlamentar` (os apps usam o roster para exibir).
+    """
+    os.makedirs(indice_dir(data_dir), exist_ok=True)
+    feitos = {}
+    for pasta in sorted(glob.glob(os.path.join(data_dir, "ano=*"))):
+        ano = int(os.path.basename(pasta).split("=", 1)[1])
+        if anos and ano not in anos:
+            continue
+        df = pd.read_parquet(
+            os.path.join(pasta, "part-0.parquet"),
+            columns=["cnpjCpfFornecedor", "nomeFornecedor", "dep_id", "ano", "valorLiquido"],
+        )
+        indice = agrega_fornecedores(df).sort_values("cnpjCpfFornecedor", kind="stable", ignore_index=True)
+        destino = os.path.join(indice_dir(data_dir), f"ano={ano}.parquet")
+        indice.to_parquet(destino + ".tmp", index=False)
+        os.replace(destino + ".tmp", destino)
+        feitos[ano] = len(indice)
+    return feitos
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Índice de fornecedores do dataset local de despesas.")
+    parser.add_argument("busca", nargs="?", help="CNPJ/CPF ou trecho do nome do fornecedor")
+    parser.add_argument("--reconstruir", action="store_true", help="refaz o índice a partir das partições")
+    parser.add_argument("--ano", type=int, action="append", default=[], help="limita a reconstrução a estes anos")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args(argv)
+    if not args.reconstruir and not args.busca:
+        parser.error("informe uma busca ou --reconstruir")
+
+    if args.reconstruir:
+        for ano, n in sorted(reconstruir(args.data_dir, args.ano).items()):
+            print(f"{ano}: {n} linhas no índice")
+    if args.busca:
+        linhas = get_indice(args.data_dir).buscar(args.busca)
+        if linhas.empty:
+            print("Nenhum fornecedor encontrado.")
+        else:
+            print(fornecedores_encontrados(linhas).to_string(index=False))
+            print()
+            print(totais_por_deputado(linhas).to_string())
+
+
+if __name__ == "__main__":
+    main()
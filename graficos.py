@@ -0,0 +1,64 @@
+"""Gráficos dos apps.
+
+Os gráficos do matplotlib viram PNG uma vez e ficam num cache do processo
+indexado pelos próprios valores plotados, então um rerun que não muda os
+dados (ex.: um checkbox da sidebar) não rasteriza de novo. Os PNGs
+contam no orçamento de `cache_memoria`, com até `GRAFICOS_MAX_BYTES`. O
+matplotlib é importado só no primeiro gráfico, e usado pela API de
+objetos (`Figure`), sem o estado global do pyplot, que não é seguro
+entre sessões.
+
+Com `CAMARA_GRAFICOS_CLIENTE=1` (ou a opção na sidebar), os apps usam
+`st.line_chart` e o navegador desenha, sem rasterizar nada no servidor.
+"""
+import io
+import os
+from functools import lru_cache
+from typing import Optional, Sequence
+
+import cache_memoria
+import metricas
+
+GRAFICOS_MAX_BYTES = int(os.environ.get("CAMARA_GRAFICOS_MAX_BYTES", str(16 * 1024 * 1024)))
+CLIENTE_PADRAO = os.environ.get("CAMARA_GRAFICOS_CLIENTE", "") not in ("", "0")
+DPI = 144
+
+cache_memoria.registrar("graficos_png", min(1.0, GRAFICOS_MAX_BYTES / cache_memoria.ORCAMENTO_BYTES))
+
+
+@lru_cache(maxsize=None)
+def _figure():
+    try:
+        from matplotlib.figure import Figure  # type: ignore
+    except Exception:
+        return None
+    return Figure
+
+
+def linha_png(
+    x: Sequence, y: Sequence[float], xlabel: str, ylabel: str, xticks: Optional[Sequence] = None
+) -> Optional[bytes]:
+    """PNG de um gráfico de linha com marcadores, em cache pelos valores; None sem matplotlib."""
+    Figure = _figure()
+    if Figure is None:
+        return None
+    chave = (tuple(x), tuple(map(float, y)), xlabel, ylabel, tuple(xticks) if xticks is not None else None)
+    _, png = cache_memoria.obter("graficos_png", chave)
+    if metricas.ATIVO:
+        metricas.incrementar("camara_graficos_total", origem="cache" if png is not None else "render")
+    if png is not None:
+        return png
+
+    fig = Figure()
+    ax = fig.subplots()
+    ax.plot(chave[0], chave[1], marker="o")
+    if xticks is not None:
+        ax.set_xticks(list(xticks))
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True, linestyle=":", alpha=0.5)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=DPI, bbox_inches="tight")
+    png = buf.getvalue()
+    cache_memoria.guardar("graficos_png", chave, png)
+    return png
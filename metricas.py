@@ -0,0 +1,158 @@
+"""Instrumentação opcional: tempos das chamadas HTTP, cache e renderização.
+
+Ligada com `CAMARA_METRICS=1`. Desligada, os decoradores devolvem a
+própria função e `secao` devolve um contexto vazio, então o custo é só
+um teste de booleano. Os números ficam num registro do processo, que o
+painel de diagnóstico da sidebar mostra e que `dump` exporta em texto no
+formato do Prometheus (`CAMARA_METRICS_FILE` grava esse texto num
+arquivo, para coleta externa).
+"""
+import functools
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Iterator, Optional
+
+ATIVO = os.environ.get("CAMARA_METRICS", "") not in ("", "0")
+ARQUIVO = os.environ.get("CAMARA_METRICS_FILE")
+INTERVALO_ARQUIVO = 15
+
+_lock = threading.Lock()
+# (métrica, rótulos) -> valor; resumos guardam [contagem, soma, máximo]
+_contadores: dict[tuple[str, tuple], float] = {}
+_resumos: dict[tuple[str, tuple], list[float]] = {}
+_ultimo_arquivo = 0.0
+_VAZIO = nullcontext()
+
+
+def _chave(nome: str, rotulos: dict) -> tuple[str, tuple]:
+    return nome, tuple(sorted(rotulos.items()))
+
+
+def incrementar(nome: str, valor: float = 1.0, **rotulos) -> None:
+    chave = _chave(nome, rotulos)
+    with _lock:
+        _contadores[chave] = _contadores.get(chave, 0.0) + valor
+
+
+def observar(nome: str, valor: float, **rotulos) -> None:
+    chave = _chave(nome, rotulos)
+    with _lock:
+        r = _resumos.setdefault(chave, [0, 0.0, 0.0])
+        r[0] += 1
+        r[1] += valor
+        r[2] = max(r[2], valor)
+
+
+def endpoint(path: str) -> str:
+    """Caminho sem ids, para agrupar (ex.: /deputados/{id}/despesas)."""
+    return re.sub(r"/\d+", "/{id}", path)
+
+
+def registrar_http(path: str, status: str, segundos: float, n_bytes: int) -> None:
+    ep = endpoint(path)
+    incrementar("camara_http_requests_total", endpoint=ep, status=status)
+    incrementar("camara_http_bytes_total", n_bytes, endpoint=ep)
+    observar("camara_http_seconds", segundos, endpoint=ep)
+
+
+def instrumentar(nome: str) -> Callable[[Callable], Callable]:
+    """Conta chamadas e mede o tempo de um fetcher (por fora do cache)."""
+    def decorador(fn: Callable) -> Callable:
+        if not ATIVO:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                incrementar("camara_cache_chamadas_total", funcao=nome)
+                observar("camara_fetch_seconds", time.perf_counter() - inicio, funcao=nome)
+        return wrapper
+    return decorador
+
+
+def contar_miss(nome: str) -> Callable[[Callable], Callable]:
+    """Conta execuções reais (por dentro do cache, ou seja, cache misses)."""
+    def decorador(fn: Callable) -> Callable:
+        if not ATIVO:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            incrementar("camara_cache_misses_total", funcao=nome)
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorador
+
+
+@contextmanager
+def _medir_secao(nome: str) -> Iterator[None]:
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar("camara_render_seconds", time.perf_counter() - inicio, secao=nome)
+
+
+def secao(nome: str) -> ContextManager[None]:
+    """Mede o tempo de renderização de uma seção da página."""
+    return _medir_secao(nome) if ATIVO else _VAZIO
+
+
+def snapshot() -> tuple[dict, dict]:
+    """Cópia de `(contadores, resumos)` para exibição."""
+    with _lock:
+        return dict(_contadores), {k: list(v) for k, v in _resumos.items()}
+
+
+def _rotulos(rotulos: tuple) -> str:
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in rotulos) + "}"
+
+
+def dump() -> str:
+    """Todas as métricas no formato de texto do Prometheus."""
+    contadores, resumos = snapshot()
+    linhas = []
+    for (nome, rotulos), valor in sorted(contadores.items()):
+        linhas.append(f"{nome}{_rotulos(rotulos)} {valor:g}")
+    for (nome, rotulos), (n, soma, maximo) in sorted(resumos.items()):
+        linhas.append(f"{nome}_count{_rotulos(rotulos)} {n:g}")
+        linhas.append(f"{nome}_sum{_rotulos(rotulos)} {soma:.6f}")
+        linhas.append(f"{nome}_max{_rotulos(rotulos)} {maximo:.6f}")
+    return "\n".join(linhas) + "\n"
+
+
+def escrever_arquivo(caminho: Optional[str] = ARQUIVO) -> None:
+    """Grava `dump()` em `caminho` (troca atômica), no máximo a cada `INTERVALO_ARQUIVO` s."""
+    global _ultimo_arquivo
+    if not ATIVO or not caminho or time.time() - _ultimo_arquivo < INTERVALO_ARQUIVO:
+        return
+    _ultimo_arquivo = time.time()
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    fd, tmp = tempfile.mkstemp(dir=pasta, prefix=".metricas-")
+    with os.fdopen(fd, "w") as f:
+        f.write(dump())
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, caminho)
+
+
+def tabela() -> list[dict]:
+    """Linhas para o painel de diagnóstico: uma por (métrica, rótulos)."""
+    contadores, resumos = snapshot()
+    linhas = [
+        {"métrica": nome, "rótulos": _rotulos(rotulos), "n": valor, "média": None, "máx": None}
+        for (nome, rotulos), valor in sorted(contadores.items())
+    ]
+    linhas += [
+        {"métrica": nome, "rótulos": _rotulos(rotulos), "n": n, "média": soma / n, "máx": maximo}
+        for (nome, rotulos), (n, soma, maximo) in sorted(resumos.items())
+    ]
+    return linhas
@@ -0,0 +1,118 @@
+"""Pré-carregamento especulativo em segundo plano.
+
+Enquanto o usuário lê a página, uma única thread do processo aquece os
+caches do que ele provavelmente abre a seguir (detalhes dos primeiros
+resultados, despesas dos anos vizinhos). A fila é limitada, cada sessão
+só tem pendente o que pediu por último, e a thread espera o primeiro
+plano ficar ocioso e respeita um intervalo mínimo entre tarefas, para
+nunca disputar a API com as requisições do usuário. Dentro de uma tarefa,
+cada requisição também espera o primeiro plano e não usa a reserva de
+fichas dele (`camara_api.background`), e a tarefa em andamento é
+cancelada quando a sessão que a pediu agenda outras ou cancela.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Collection, Hashable, Optional
+
+from camara_api import background, foreground_idle
+
+MAX_PENDENTES = int(os.environ.get("CAMARA_PREFETCH_MAX", "32"))
+INTERVALO = float(os.environ.get("CAMARA_PREFETCH_INTERVALO", "0.5"))
+# Quantos resultados da busca têm os detalhes pré-carregados
+PREFETCH_RESULTADOS = int(os.environ.get("CAMARA_PREFETCH_RESULTADOS", "5"))
+# Tarefa já executada há menos que isto não é repetida
+VALIDADE = 300
+_ESPERA_OCIOSO = 0.05
+
+
+class Prefetcher:
+    def __init__(self, max_pendentes: int = MAX_PENDENTES, intervalo: float = INTERVALO):
+        self.max_pendentes = max_pendentes
+        self.intervalo = intervalo
+        self._fila: deque[tuple[Hashable, Hashable, Callable[[], object]]] = deque()
+        self._feitas: OrderedDict[Hashable, float] = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        # Tarefa em execução: (dono, chave, evento de cancelamento)
+        self._atual: Optional[tuple[Hashable, Hashable, threading.Event]] = None
+
+    def agendar(self, dono: Hashable, tarefas: list[tuple[Hashable, Callable[[], object]]]) -> None:
+        """Substitui as tarefas pendentes de `dono` por `tarefas` (pares `(chave, função)`)."""
+        agora = time.time()
+        with self._cond:
+            self._remover(dono)
+            self._cancelar_atual(dono, manter={chave for chave, _ in tarefas})
+            for chave, fn in tarefas:
+                if agora - self._feitas.get(chave, 0) > VALIDADE:
+                    self._fila.append((dono, chave, fn))
+            # Fila cheia: descarta as tarefas mais antigas
+            while len(self._fila) > self.max_pendentes:
+                self._fila.popleft()
+            self._iniciar()
+            self._cond.notify()
+
+    def cancelar(self, dono: Hashable) -> None:
+        """Descarta as tarefas pendentes de `dono` e cancela a que estiver em execução."""
+        with self._cond:
+            self._remover(dono)
+            self._cancelar_atual(dono)
+
+    def pendentes(self) -> int:
+        return len(self._fila)
+
+    def _remover(self, dono: Hashable) -> None:
+        self._fila = deque(t for t in self._fila if t[0] != dono)
+
+    def _cancelar_atual(self, dono: Hashable, manter: Collection[Hashable] = ()) -> None:
+        if self._atual is not None and self._atual[0] == dono and self._atual[1] not in manter:
+            self._atual[2].set()
+
+    def _iniciar(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._rodar, name="prefetch", daemon=True)
+            self._thread.start()
+
+    def _proxima(self) -> tuple[Hashable, Callable[[], object], threading.Event]:
+        with self._cond:
+            self._atual = None
+            while not self._fila:
+                self._cond.wait()
+            dono, chave, fn = self._fila.popleft()
+            cancelado = threading.Event()
+            self._atual = (dono, chave, cancelado)
+            return chave, fn, cancelado
+
+    def _rodar(self) -> None:
+        while True:
+            chave, fn, cancelado = self._proxima()
+            while not foreground_idle():
+                time.sleep(_ESPERA_OCIOSO)
+            inicio = time.monotonic()
+            try:
+                with background(cancelado=cancelado):
+                    fn()
+            except Exception:
+                # Falha ou cancelamento de uma tarefa especulativa não derruba a thread
+                pass
+            else:
+                with self._cond:
+                    self._feitas[chave] = time.time()
+                    self._feitas.move_to_end(chave)
+                    while len(self._feitas) > 4 * self.max_pendentes:
+                        self._feitas.popitem(last=False)
+            time.sleep(max(0.0, self.intervalo - (time.monotonic() - inicio)))
+
+
+_prefetcher: Optional[Prefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    """Prefetcher compartilhado do processo."""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher()
+        return _prefetcher
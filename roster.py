@@ -0,0 +1,114 @@
+"""Cadastro local dos deputados em exercício, com busca instantânea por nome.
+
+O roster completo vem da API uma vez (todas as páginas de `/deputados`) e
+é renovado a cada `ROSTER_TTL` segundos. As buscas ignoram acentos e
+maiúsculas ("joao" encontra "João") e são respondidas em memória, com os
+mesmos registros que a API devolve. A matriz partido × UF também sai
+daqui, calculada uma vez por recarga. O tamanho do roster é descontado
+do orçamento de `cache_memoria`.
+"""
+import os
+import threading
+import time
+import unicodedata
+from functools import cached_property
+from typing import Optional
+
+import pandas as pd
+import requests
+
+import cache_memoria
+from camara_api import fetch_pages
+
+ROSTER_TTL = int(os.environ.get("CAMARA_ROSTER_TTL", str(6 * 3600)))
+# Após uma recarga com erro, espera isto antes de tentar de novo
+ROSTER_RETRY = 60
+
+
+def normalize_nome(texto: str) -> str:
+    """Forma de comparação: sem acentos, minúsculas e espaços simples."""
+    sem_acento = "".join(
+        c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c)
+    )
+    return " ".join(sem_acento.casefold().split())
+
+
+class RosterIndex:
+    """Índice em memória dos deputados, por nome normalizado."""
+
+    def __init__(self, deputados: list[dict]):
+        self.deputados = sorted(deputados, key=lambda d: normalize_nome(d.get("nome") or ""))
+        self._chaves = [normalize_nome(d.get("nome") or "") for d in self.deputados]
+        self.carregado_em = time.time()
+
+    def __len__(self) -> int:
+        return len(self.deputados)
+
+    def buscar(self, texto: str) -> list[dict]:
+        """Deputados cujo nome contém `texto`; quem começa uma palavra com ele vem antes."""
+        alvo = normalize_nome(texto)
+        if not alvo:
+            return []
+        prefixo, meio = [], []
+        for chave, dep in zip(self._chaves, self.deputados):
+            pos = chave.find(alvo)
+            if pos == 0 or (pos > 0 and chave[pos - 1] == " "):
+                prefixo.append(dep)
+            elif pos > 0:
+                meio.append(dep)
+        return prefixo + meio
+
+    def filtrar(self, partido: Optional[str] = None, uf: Optional[str] = None) -> list[dict]:
+        """Deputados de um partido e/ou UF (siglas)."""
+        return [
+            d for d in self.deputados
+            if (partido is None or d.get("siglaPartido") == partido)
+            and (uf is None or d.get("siglaUf") == uf)
+        ]
+
+    @cached_property
+    def partido_uf(self) -> pd.DataFrame:
+        """Contagem de deputados por partido (linhas) e UF (colunas)."""
+        df = pd.DataFrame(self.deputados, columns=["siglaPartido", "siglaUf"])
+        return pd.crosstab(df["siglaPartido"], df["siglaUf"])
+
+    def contagem_uf(self, partido: str) -> pd.Series:
+        """Deputados do partido por UF (só UFs com ao menos um)."""
+        if partido not in self.partido_uf.index:
+            return pd.Series(dtype="int64", name=partido)
+        linha = self.partido_uf.loc[partido]
+        return linha[linha > 0]
+
+
+_roster: Optional[RosterIndex] = None
+_roster_lock = threading.Lock()
+cache_memoria.registrar("roster")
+
+
+def fetch_roster() -> list[dict]:
+    """Todos os deputados em exercício (todas as páginas)."""
+    dados, _ = fetch_pages("/deputados", {"ordem": "ASC", "ordenarPor": "nome"})
+    return dados
+
+
+def get_roster() -> RosterIndex:
+    """Roster compartilhado do processo, recarregado quando passa de `ROSTER_TTL`.
+
+    Se a recarga falhar e já houver um roster, segue com o anterior e só
+    tenta de novo depois de `ROSTER_RETRY` segundos.
+    """
+    global _roster
+    atual = _roster
+    if atual is not None and time.time() - atual.carregado_em <= ROSTER_TTL:
+        return atual
+    with _roster_lock:
+        if _roster is not None and _roster is not atual:
+            return _roster
+        try:
+            _roster = RosterIndex(fetch_roster())
+            cache_memoria.reservar("roster", None, cache_memoria.tamanho(_roster.deputados))
+        except requests.RequestException:
+            if _roster is None:
+                raise
+            _roster.carregado_em = time.time() - ROSTER_TTL + ROSTER_RETRY
+        return _roster
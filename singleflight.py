@@ -0,0 +1,43 @@
+"""Junção de chamadas idênticas em andamento (single-flight).
+
+Fica fora de `camara_api` para que `cache_memoria` possa usá-lo sem
+importar o cliente HTTP, que guarda as respostas revalidáveis no
+orçamento de `cache_memoria`.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable, TypeVar
+
+import metricas
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Junta chamadas idênticas em andamento: a primeira executa e as demais esperam o resultado."""
+
+    def __init__(self):
+        self._voos: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def executar(self, chave: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = Future()
+        if not lider:
+            if metricas.ATIVO:
+                metricas.incrementar("camara_coalescidas_total")
+            return voo.result()
+        try:
+            resultado = fn()
+        except BaseException as e:
+            voo.set_exception(e)
+            raise
+        else:
+            voo.set_result(resultado)
+            return resultado
+        finally:
+            with self._lock:
+                del self._voos[chave]
@@ -0,0 +1,38 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def servidor():
+    """Servidor HTTP local; `responder(handler)` devolve (status, headers, corpo) para cada GET."""
+    estado = {"responder": None, "hits": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            estado["hits"] += 1
+            status, headers, corpo = estado["responder"](self)
+            dados = json.dumps(corpo).encode() if corpo is not None else b""
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    estado["url"] = f"http://127.0.0.1:{srv.server_port}/api/v2"
+    yield estado
+    srv.shutdown()
+    srv.server_close()
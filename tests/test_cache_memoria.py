@@ -0,0 +1,34 @@
+from cache_memoria import CacheLimitado
+
+
+def _cache(orcamento: int = 1000) -> CacheLimitado:
+    cache = CacheLimitado(orcamento)
+    for nome in ("a", "b", "indice"):
+        cache.registrar(nome)
+    return cache
+
+
+def test_reserva_conta_no_orcamento_e_empurra_as_demais():
+    cache = _cache()
+    for i in range(4):
+        cache.guardar("a", i, None, None, n=200)
+    cache.reservar("indice", None, 500)
+    total = cache.estatisticas()[-1]
+    assert total["bytes"] <= 1000
+    assert cache.obter("a", 3) == (True, None)
+    assert not cache.obter("a", 0)[0]
+
+
+def test_reserva_nunca_sai_e_substitui_a_anterior():
+    cache = _cache()
+    cache.reservar("indice", None, 600)
+    cache.reservar("indice", None, 700)
+    cache.guardar("b", 1, None, None, n=200)
+    # Nem descartando a outra cabe ao lado da reserva: a nova não fica
+    cache.guardar("b", 2, None, None, n=350)
+    assert not cache.obter("b", 2)[0]
+    linhas = {e["funcao"]: e for e in cache.estatisticas()}
+    assert linhas["indice"]["bytes"] == 700
+    assert linhas["(total)"]["bytes"] == 700
+    cache.limpar()
+    assert cache.estatisticas()[-1]["bytes"] == 700
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+import camara_api
+
+
+class BucketFalso:
+    capacidade = 1
+
+    def __init__(self):
+        self.pausas = []
+
+    def adquirir(self, reserva=0.0):
+        pass
+
+    def pausar(self, segundos):
+        self.pausas.append(segundos)
+
+
+@pytest.fixture
+def api(servidor, monkeypatch):
+    monkeypatch.setattr(camara_api, "API_BASE", servidor["url"])
+    monkeypatch.setattr(camara_api, "VALIDADORES_MAX_BYTES", 0)
+    bucket = BucketFalso()
+    monkeypatch.setattr(camara_api, "_limite", bucket)
+    camara_api.configure_session(camara_api.POOL_SIZE)
+    yield servidor, bucket
+    camara_api.configure_session(camara_api.POOL_SIZE)
+
+
+def test_429_com_retry_after_pausa_o_processo(api):
+    servidor, bucket = api
+    servidor["responder"] = lambda h: (
+        (429, {"Retry-After": "2"}, None) if servidor["hits"] == 1 else (200, {}, {"dados": [1]})
+    )
+    inicio = time.monotonic()
+    assert camara_api.api_get("/x") == {"dados": [1]}
+    # Quem espera é o token bucket (falso aqui), não o urllib3 nesta thread
+    assert time.monotonic() - inicio < 1.0
+    assert servidor["hits"] == 2
+    assert bucket.pausas == [2.0]
+
+
+def test_retry_after_tem_teto(api):
+    servidor, bucket = api
+    servidor["responder"] = lambda h: (
+        (429, {"Retry-After": "3600"}, None) if servidor["hits"] == 1 else (200, {}, {"dados": []})
+    )
+    camara_api.api_get("/y")
+    assert bucket.pausas == [camara_api.MAX_RETRY_AFTER]
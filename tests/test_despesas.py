@@ -0,0 +1,34 @@
+import json
+import os
+
+import cache_memoria
+from despesas import normalize_despesas
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "bench", "fixtures", "despesas.json")
+
+
+def _linhas(n: int = 20) -> list[dict]:
+    with open(FIXTURE, encoding="utf-8") as f:
+        modelo = json.load(f)
+    return [dict(modelo[i % len(modelo)], codDocumento=i) for i in range(n)]
+
+
+def test_memo_reaproveita_pelo_conteudo():
+    df = normalize_despesas(_linhas(), chave=("memo", 1))
+    # Objetos novos, mesmo conteúdo: não remonta
+    assert normalize_despesas(_linhas(), chave=("memo", 1)) is df
+    mudadas = _linhas()
+    mudadas[0]["valorLiquido"] = 1.0
+    assert normalize_despesas(mudadas, chave=("memo", 1)) is not df
+
+
+def test_memo_respeita_teto_de_bytes(monkeypatch):
+    um = int(normalize_despesas(_linhas()).memory_usage(index=True, deep=True).sum())
+    cache = cache_memoria.CacheLimitado(orcamento=10 * um)
+    cache.registrar("normalize_despesas", (2 * um + um // 2) / cache.orcamento)
+    monkeypatch.setattr(cache_memoria, "_cache", cache)
+    for i in range(5):
+        normalize_despesas(_linhas(), chave=("teto", i))
+    linha = next(e for e in cache.estatisticas() if e["funcao"] == "normalize_despesas")
+    assert linha["entradas"] == 2 and linha["descartes"] == 3
+    assert linha["bytes"] <= linha["cota_bytes"]
@@ -0,0 +1,34 @@
+import os
+
+import pandas as pd
+
+import despesas_dataset
+
+ARQUIVO = os.path.join(os.path.dirname(__file__), "fixtures", "Ano-2023.csv.zip")
+
+
+def test_ingestao_de_arquivo_sem_glosa(tmp_path):
+    # O arquivo não tem vlrGlosa nem numRessarcimento; a linha de liderança fica de fora
+    data_dir = str(tmp_path / "despesas")
+    assert despesas_dataset.ingest_archive(ARQUIVO, data_dir) == {2023: 2}
+
+    linhas = despesas_dataset.read_despesas(204554, 2023, data_dir)
+    assert [r["codDocumento"] for r in linhas] == [7500002, 7500001]
+    assert linhas[0]["valorLiquido"] == 89.90
+    assert linhas[0]["valorGlosa"] is None and linhas[0]["numRessarcimento"] is None
+
+    cubo = despesas_dataset.read_cubo(204554, 2023, data_dir)
+    assert cubo["linhas"].sum() == 2
+    assert round(cubo["valorLiquido"].sum(), 2) == 340.40
+
+
+def test_agregados_nao_dependem_do_tamanho_do_bloco(tmp_path):
+    # Bloco de 1 linha: os agregados são acumulados bloco a bloco e devem sair iguais
+    for nome, chunk_rows in (("inteiro", 50_000), ("linha_a_linha", 1)):
+        despesas_dataset.ingest_archive(ARQUIVO, str(tmp_path / nome), chunk_rows=chunk_rows)
+    for agregado in despesas_dataset.AGREGADOS:
+        a, b = (
+            pd.read_parquet(os.path.join(despesas_dataset.agregado_dir(str(tmp_path / nome), agregado), "ano=2023.parquet"))
+            for nome in ("inteiro", "linha_a_linha")
+        )
+        pd.testing.assert_frame_equal(a, b)
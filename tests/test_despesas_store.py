@@ -0,0 +1,143 @@
+import os
+import time
+from datetime import date, datetime
+
+import pytest
+
+import camara_api
+import despesas_dataset
+import despesas_store
+
+ANO = date.today().year
+POR_PAGINA = 2
+
+
+def _doc(cod: int, dia: str) -> dict:
+    return {"codDocumento": cod, "dataDocumento": f"{ANO}-{dia}T00:00:00", "valorLiquido": float(cod)}
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    """Lista de documentos servida em páginas de `POR_PAGINA`, como a API (já em ordem DESC)."""
+    estado = {"docs": [], "paginas": 0}
+
+    def api_get(path, params=None):
+        estado["paginas"] += 1
+        n = params["pagina"]
+        pagina = estado["docs"][(n - 1) * POR_PAGINA:n * POR_PAGINA]
+        links = [{"rel": "next"}] if n * POR_PAGINA < len(estado["docs"]) else []
+        return {"dados": pagina, "links": links}
+
+    monkeypatch.setattr(camara_api, "api_get", api_get)
+    return estado
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    monkeypatch.setattr(despesas_store, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(despesas_store, "DB_PATH", str(tmp_path / "despesas.sqlite3"))
+    monkeypatch.setattr(despesas_store, "_dataset_vale", lambda ano: False)
+
+
+def _buscado_em(quando: float) -> None:
+    with despesas_store._connect() as con:
+        con.execute("UPDATE despesas SET buscado_em = ?", (quando,))
+        con.execute("UPDATE cubos SET buscado_em = ?", (quando,))
+
+
+def _codigos(dados: list[dict]) -> list[int]:
+    return [d["codDocumento"] for d in dados]
+
+
+def test_novos_no_topo(servidor):
+    anteriores = [_doc(6, "12-10"), _doc(5, "12-08"), _doc(4, "12-05"), _doc(3, "12-01"),
+                  _doc(2, "11-25"), _doc(1, "11-20")]
+    servidor["docs"] = [_doc(7, "12-20")] + anteriores
+    dados, completa = despesas_store._sincronizar(1, ANO, anteriores)
+    assert _codigos(dados) == [7, 6, 5, 4, 3, 2, 1]
+    assert not completa
+    # Para logo depois de passar da data do primeiro conhecido, sem ler as 4 páginas
+    assert servidor["paginas"] == 2
+
+
+def test_apagado_no_trecho_lido_sai(servidor):
+    anteriores = [_doc(9, "12-15"), _doc(4, "12-10"), _doc(3, "12-05"), _doc(2, "12-01")]
+    servidor["docs"] = [_doc(5, "12-20"), _doc(4, "12-10"), _doc(3, "12-05"), _doc(2, "12-01")]
+    dados, _ = despesas_store._sincronizar(1, ANO, anteriores)
+    assert _codigos(dados) == [5, 4, 3, 2]
+
+
+def test_empate_na_data_do_conhecido(servidor):
+    # O novo (6) tem a mesma data do conhecido (4) e veio depois dele, na página seguinte
+    anteriores = [_doc(4, "12-10"), _doc(3, "12-10"), _doc(2, "12-01"), _doc(1, "11-20")]
+    servidor["docs"] = [_doc(5, "12-20"), _doc(4, "12-10"), _doc(6, "12-10"), _doc(3, "12-10"),
+                        _doc(2, "12-01"), _doc(1, "11-20")]
+    dados, completa = despesas_store._sincronizar(1, ANO, anteriores)
+    assert sorted(_codigos(dados)) == [1, 2, 3, 4, 5, 6]
+    assert len(dados) == len({d["codDocumento"] for d in dados})
+    assert not completa
+
+
+def test_empate_na_data_de_corte_mantem_as_salvas(servidor):
+    anteriores = [_doc(4, "12-10"), _doc(3, "12-01"), _doc(2, "12-01"), _doc(1, "11-20")]
+    servidor["docs"] = [_doc(5, "12-20"), _doc(4, "12-10"), _doc(3, "12-01"), _doc(2, "12-01"), _doc(1, "11-20")]
+    dados, _ = despesas_store._sincronizar(1, ANO, anteriores)
+    # A página 2 termina em 12-01, mas o 2 (mesma data) só viria na seguinte: fica o salvo
+    assert _codigos(dados) == [5, 4, 3, 2, 1]
+    assert servidor["paginas"] == 2
+
+
+def test_fim_sem_conhecidos_conta_como_busca_completa(servidor, banco):
+    despesas_store.save(1, ANO, [_doc(2, "12-01"), _doc(1, "11-20")], False)
+    with despesas_store._connect() as con:
+        con.execute("UPDATE sincronias SET completa_em = ?", (time.time() - 3600,))
+        con.execute("UPDATE despesas SET buscado_em = 0")
+    # Tudo foi refeito na API: nenhuma página traz um documento salvo
+    servidor["docs"] = [_doc(7, "12-20"), _doc(6, "12-02")]
+    dados, truncado = despesas_store._buscar_e_salvar(1, ANO)
+    assert _codigos(dados) == [7, 6] and not truncado
+    with despesas_store._connect() as con:
+        (completa_em,) = con.execute("SELECT completa_em FROM sincronias").fetchone()
+    assert time.time() - completa_em < 60
+
+
+def test_ano_fechado_buscado_depois_do_fechamento_vale_para_sempre(banco):
+    ano = ANO - 3
+    despesas_store.save(1, ano, [_doc(1, "11-20")], False)
+    _buscado_em(despesas_store.fechamento(ano) + 1)
+    assert despesas_store.load(1, ano) is not None
+    assert despesas_store.has_local(1, ano)
+    assert despesas_store.load_cubo(1, ano) is not None
+
+
+def test_ano_fechado_buscado_com_o_ano_aberto_vence(banco):
+    # Retrato de junho, quando o ano ainda estava aberto: não vira o dado definitivo
+    ano = ANO - 3
+    despesas_store.save(1, ano, [_doc(1, "05-20")], False)
+    _buscado_em(datetime(ano, 6, 15).timestamp())
+    assert despesas_store.load(1, ano) is None
+    assert not despesas_store.has_local(1, ano)
+    assert despesas_store.load_cubo(1, ano) is None
+
+
+def test_ano_aberto_segue_a_validade(banco):
+    despesas_store.save(1, ANO, [_doc(1, "01-20")], False)
+    assert despesas_store.load(1, ANO) is not None
+    _buscado_em(time.time() - despesas_store.REFRESH_SECONDS - 1)
+    assert despesas_store.load(1, ANO) is None
+    assert despesas_store.load_cubo(1, ANO) is None
+
+
+def test_particao_ingerida_com_o_ano_aberto_vence(tmp_path, monkeypatch):
+    ano = ANO - 3
+    particao = tmp_path / f"ano={ano}" / "part-0.parquet"
+    particao.parent.mkdir()
+    particao.write_bytes(b"")
+    idade = despesas_dataset.partition_age
+    monkeypatch.setattr(despesas_dataset, "partition_age", lambda a: idade(a, str(tmp_path)))
+    meio_do_ano = datetime(ano, 7, 1).timestamp()
+    os.utime(particao, (meio_do_ano, meio_do_ano))
+    assert not despesas_store._dataset_vale(ano)
+    depois = despesas_store.fechamento(ano) + 3600
+    os.utime(particao, (depois, depois))
+    assert despesas_store._dataset_vale(ano)
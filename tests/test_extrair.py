@@ -0,0 +1,29 @@
+import json
+import os
+
+import camara_api
+import extrair
+
+
+def test_erro_inesperado_num_par_vira_falha(tmp_path, monkeypatch):
+    def extrair_par(dep_id, ano, saida, formato, direto=False):
+        if ano == 2020:
+            raise ValueError("linha inesperada")
+        return 3, False
+
+    monkeypatch.setattr(extrair, "extrair_par", extrair_par)
+    # main() troca o limite de taxa e a sessão do processo
+    for nome in ("_limite", "_session", "RATE_LIMIT", "RATE_BURST", "POOL_SIZE"):
+        monkeypatch.setattr(camara_api, nome, getattr(camara_api, nome))
+    relatorio = tmp_path / "resumo.json"
+    codigo = extrair.main(
+        ["1", "2", "--ano-ini", "2019", "--ano-fim", "2020", "--saida", str(tmp_path),
+         "--relatorio", str(relatorio), "--taxa", "0"]
+    )
+    resumo = json.loads(relatorio.read_text())
+    assert codigo == 1
+    assert sorted(map(tuple, resumo["falhas"])) == [(1, 2020), (2, 2020)]
+    assert resumo["linhas"] == 6
+    # Só os pares concluídos entram no checkpoint
+    assert extrair.ler_checkpoint(str(tmp_path)) == {(1, 2019), (2, 2019)}
+    assert os.path.exists(tmp_path / extrair.CHECKPOINT)
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+import camara_api
+from camara_api import TokenBucket
+from prefetch import Prefetcher
+
+
+def _esperar(condicao, limite: float = 2.0) -> bool:
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if condicao():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def chamadas(monkeypatch):
+    feitas = []
+    monkeypatch.setattr(camara_api, "_get", lambda path, params, chave: feitas.append(path) or {"dados": []})
+    return feitas
+
+
+def test_segundo_plano_nao_consome_a_reserva():
+    bucket = TokenBucket(taxa=0.01, capacidade=4)
+    bucket.adquirir(reserva=2)
+    bucket.adquirir(reserva=2)
+    # Sobraram 2 fichas: o segundo plano espera, o primeiro plano passa
+    fundo = threading.Thread(target=bucket.adquirir, kwargs={"reserva": 2}, daemon=True)
+    fundo.start()
+    fundo.join(0.2)
+    assert fundo.is_alive()
+    inicio = time.monotonic()
+    bucket.adquirir()
+    assert time.monotonic() - inicio < 0.1
+
+
+def test_erro_inesperado_nao_derruba_a_thread(chamadas):
+    prefetcher = Prefetcher(intervalo=0)
+    feitas = []
+    prefetcher.agendar("sessao", [("ruim", lambda: 1 / 0), ("boa", lambda: feitas.append("boa"))])
+    assert _esperar(lambda: feitas == ["boa"])
+
+
+def test_tarefa_em_andamento_e_cancelada(chamadas, monkeypatch):
+    # Primeiro plano ocupado: a tarefa já saiu da fila, mas espera a vez
+    monkeypatch.setattr(camara_api, "_em_voo", 1)
+    prefetcher = Prefetcher(intervalo=0)
+    prefetcher.agendar("sessao", [("anos", lambda: [camara_api.api_get(f"/p/{n}") for n in range(5)])])
+    assert _esperar(lambda: prefetcher.pendentes() == 0)
+    prefetcher.cancelar("sessao")
+    camara_api._em_voo = 0
+    assert _esperar(lambda: prefetcher._atual is None)
+    assert chamadas == []
+
+
+def test_segundo_plano_espera_o_primeiro_plano(chamadas, monkeypatch):
+    monkeypatch.setattr(camara_api, "_em_voo", 1)
+    def buscar():
+        with camara_api.background():
+            camara_api.api_get("/x")
+
+    t = threading.Thread(target=buscar)
+    t.start()
+    t.join(0.2)
+    assert chamadas == []
+    camara_api._em_voo = 0
+    t.join(2)
+    assert chamadas == ["/x"]